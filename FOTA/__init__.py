@@ -1,10 +1,6 @@
 __version__ = "0.0.2"
 
-# highly recommended to set a lowish garbage collection threshold
-# to minimise memory fragmentation as we sometimes want to
-# allocate relatively large blocks of ram.
-import gc, os, machine
-gc.threshold(50000)
+import os, machine
 
 # phew! the Pico (or Python) HTTP Endpoint Wrangler
 import logging
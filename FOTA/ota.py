@@ -3,15 +3,23 @@ import urequests
 import os
 import json
 import machine
+import sys
 from time import sleep
 import logging
 import gc
+import gc_policy
            
 
 class OTAUpdater:
-    """ This class handles OTA updates. It connects to the Wi-Fi, checks for updates, downloads and installs them."""
-    def __init__(self, repo_url, filenames):
-        self.filenames = filenames
+    """ This class handles OTA updates. It connects to the Wi-Fi, checks for updates, downloads and installs them.
+
+    The files to fetch are listed in the latest release's version.json (written by build_mpy.py), filenames is
+    only used for a release without that list. Modules are fetched as .mpy bytecode from the mpy/ directory when
+    the release was built for the bytecode version and architecture this firmware runs, and from source otherwise,
+    or if their .mpy can't be fetched. main.py, the entry point, is always fetched from source."""
+    def __init__(self, repo_url, filenames = None):
+        self.filenames = filenames or []
+        self.mpy_abi = None # Of the latest release, from its version.json
         self.repo_url = repo_url
         if "www.github.com" in self.repo_url :
             logging.debug(f"> Updating {repo_url} to raw.githubusercontent")
@@ -21,9 +29,9 @@ class OTAUpdater:
             self.repo_url = self.repo_url.replace("github","raw.githubusercontent")            
         self.version_url = self.repo_url + 'main/version.json'
         logging.debug(f"> Version url is: {self.version_url}")
-        self.firmware_urls= []
-        for filename in self.filenames:
-            self.firmware_urls.append(self.repo_url + 'main/' + filename)
+        # Bytecode version this firmware loads (low byte), and the sub-version and architecture of the machine
+        # code it runs (higher bits), as recorded by build_mpy.py
+        self.device_mpy_abi = getattr(sys.implementation, '_mpy', 0)
 
         # get the current version (stored in version.json)
         if 'version.json' in os.listdir():    
@@ -38,45 +46,68 @@ class OTAUpdater:
                 json.dump({'version': self.current_version}, f)
             
 
-    def download_update_and_reset(self):
-        """Fetch the latest code from the repo in chunks, update, and reset."""
-        
-        index = 0
-        for firmware_url in self.firmware_urls:
-            gc.collect()  # Free memory before request
+    def download(self, url, filename):
+        """ Fetches url in chunks into filename, returns True on success."""
+        gc.collect()  # Free memory before request
+        try:
+            response = urequests.get(url, stream=True)  # Enable streaming
+        except OSError:
+            logging.error(f'> Memory allocation failed for {url}')
+            return False
+
+        success = False
+        if response.status_code == 200:
+            logging.info(f'> Fetched latest firmware for {filename}, status: {response.status_code}')
             try:
-                response = urequests.get(firmware_url, stream=True)  # Enable streaming
-            except OSError:
-                logging.error(f'> Memory allocation failed for {firmware_url}')
-                continue  # Skip to the next URL
+                with open('latest_code.tmp', 'wb') as f:
+                    chunk = bytearray(1024)  # Read in 1KB chunks, into the same buffer
+                    while True:
+                        gc_policy.collect_if_low()  # Free memory during download, if needed
+                        size = response.raw.readinto(chunk)
+                        if not size:
+                            break
+                        f.write(memoryview(chunk)[:size])  # Write each chunk to file
+                logging.debug("> Updating device...")
+                os.rename('latest_code.tmp', filename)  # Replace old code
+                success = True
+            except MemoryError:
+                logging.error(f'> Memory allocation failed while writing {filename}')
+        else:
+            logging.error(f'> Firmware not found - {url}')
 
-            if response.status_code == 200:
-                filename = self.filenames[index]
-                logging.info(f'> Fetched latest firmware for {filename}, status: {response.status_code}')
-                
-                try:
-                    with open('latest_code.py', 'w') as f:
-                        chunk_size = 1024  # Read in 1KB chunks
-                        while True:
-                            gc.collect()  # Free memory during download
-                            chunk = response.raw.read(chunk_size)
-                            if not chunk:
-                                break
-                            f.write(chunk)  # Write each chunk to file
-                    response.close()
-                    
-                    logging.debug("> Updating device...")
-                    os.rename('latest_code.py', filename)  # Replace old code
+        response.close()
+        gc.collect()  # Free memory after each file
+        return success
 
-                except MemoryError:
-                    logging.error(f'> Memory allocation failed while writing {filename}')
-            
-            else:
-                logging.error(f'> Firmware not found - {firmware_url}')
-            
-            index += 1
-            response.close()
-            gc.collect()  # Free memory after each file
+    def remove(self, filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
+
+    def mpy_compatible(self):
+        """ True if the release's .mpy files can be loaded by this firmware."""
+        if self.mpy_abi is None or self.mpy_abi & 0xff != self.device_mpy_abi & 0xff:
+            return False
+        # Without machine code, the sub-version and architecture bits of the release are 0
+        return not self.mpy_abi >> 8 or self.mpy_abi >> 8 == self.device_mpy_abi >> 8
+
+    def download_update_and_reset(self):
+        """Fetch the latest code from the repo in chunks, update, and reset."""
+        use_mpy = self.mpy_compatible()
+        if not use_mpy:
+            logging.info(f'> Release bytecode {self.mpy_abi} does not match {self.device_mpy_abi}, fetching sources')
+
+        for filename in self.filenames:
+            firmware_url = self.repo_url + 'main/' + filename
+            if use_mpy and filename.endswith('.py') and filename != 'main.py':
+                compiled = filename[:-3] + '.mpy'
+                if self.download(self.repo_url + 'main/mpy/' + compiled, compiled):
+                    self.remove(filename) # A .py would be imported instead of the .mpy
+                    continue
+                logging.warn(f'> No bytecode for {filename}, fetching its source')
+            if self.download(firmware_url, filename) and filename.endswith('.py'):
+                self.remove(filename[:-3] + '.mpy') # Would be stale
 
         logging.debug('> Restarting device...')
         machine.reset()  # Reset to apply update         
@@ -97,10 +128,15 @@ class OTAUpdater:
 
         
         self.latest_version = int(data['version'])
+        self.mpy_abi = data.get('mpy_abi')
+        self.filenames = data.get('files', self.filenames)
         logging.debug(f'> Latest version is: {self.latest_version}')
         
         # compare versions
         self.newer_version_available = True if self.current_version < self.latest_version else False
+        if self.newer_version_available and not self.filenames:
+            logging.error('> The latest release does not list its files')
+            self.newer_version_available = False
         
         logging.debug(f'> Newer version available: {self.newer_version_available}')    
         return self.newer_version_available
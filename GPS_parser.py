@@ -1,37 +1,68 @@
 import utime
 import math
+from array import array
+from micropython import const
 from memory import access_setting
+from kernels import frame, split, decimal, coordinate
 
+_CHUNK = const(64)    # Bytes read from the UART at once
+_SENTENCE = const(96) # NMEA sentences are 82 characters at most
+_FIELDS = const(20)
 
-def _nmea_checksum_ok(sentence: bytes) -> bool:
-    # sentence like b"$GPRMC,....*CS\r\n"
-    try:
-        star = sentence.rfind(b'*')
-        if star == -1:
-            return False
-        cs = int(sentence[star+1:star+3], 16)
-        body = sentence[1:star]
-        calc = 0
-        for b in body:
-            calc ^= b
-        return calc == cs
-    except:
-        return False
-
-def _dm_to_degrees(dm, hemi):
-    # dm like "4807.038", hemi 'N'/'S' or 'E'/'W'
-    if not dm or not hemi:
-        return None
-    try:
-        dm = float(dm)
-    except:
-        return None
-    deg = int(dm // 100)
-    minutes = dm - deg * 100
-    dec = deg + minutes / 60.0
-    if hemi in ('S', 'W'):
-        dec = -dec
-    return dec
+# Sentence types, from the last 3 letters of the first field
+_RMC = const(0x524d43)
+_GGA = const(0x474741)
+
+_EARTH_RADIUS = 6371000.0 # meters
+_METERS_PER_UDEG = 0.11119492664455873 # Along a meridian, per 1e-6 degree
+_MAX_STEP = const(90_000) # 1e-6 degrees, about 10km: longer steps are measured with the haversine
+
+def haversine(lat1, lon1, lat2, lon2):
+    # Meters between two points in 1e-6 degrees
+    phi1 = math.radians(lat1 / 1_000_000)
+    phi2 = math.radians(lat2 / 1_000_000)
+    dphi = math.radians((lat2 - lat1) / 1_000_000)
+    dl   = math.radians((lon2 - lon1) / 1_000_000)
+    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dl/2)**2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return _EARTH_RADIUS * c
+
+class Distance:
+    """ Meters between two fixes, through an equirectangular projection: the longitude delta is scaled by the
+    cosine of the latitude, cached for the area driven in. The area is as large as the cosine stays within
+    max_error (relative) of the one at the fixes, about max_error / tan(latitude) radians. Steps longer than
+    _MAX_STEP, after a loss of signal for instance, are measured with the haversine instead."""
+    def __init__(self, max_error = 1e-4):
+        self.max_error = max_error
+        self.latitude = None # 1e-6 degrees, where the cosine was computed
+        self.area = 0        # 1e-6 degrees around latitude where it holds
+        self.cos = 1.0
+        self.haversines = 0  # Steps too long for the projection
+
+    def meters(self, lat1, lon1, lat2, lon2):
+        dlat = lat2 - lat1
+        dlon = lon2 - lon1
+        if dlon > 180_000_000: # Across the antimeridian
+            dlon -= 360_000_000
+        elif dlon < -180_000_000:
+            dlon += 360_000_000
+        if abs(dlat) > _MAX_STEP or abs(dlon) > _MAX_STEP:
+            self.haversines += 1
+            return haversine(lat1, lon1, lat2, lon2)
+        middle = lat1 + dlat // 2
+        if self.latitude is None or abs(middle - self.latitude) > self.area:
+            self._cache(middle)
+        dx = dlon * self.cos
+        dy = float(dlat) # Its square would overflow a small int
+        return math.sqrt(dx * dx + dy * dy) * _METERS_PER_UDEG
+
+    def _cache(self, latitude):
+        phi = math.radians(latitude / 1_000_000)
+        self.latitude = latitude
+        self.cos = math.cos(phi)
+        tan = abs(math.tan(phi))
+        span = math.radians(1) if tan * math.radians(1) <= self.max_error else self.max_error / tan
+        self.area = int(math.degrees(span) * 1_000_000)
 
 def _knots_to_mph(kn):
     return kn * 1.150779448  # exact enough
@@ -41,16 +72,131 @@ def _knots_to_kmh(kn):
 
 # ----------------- parsed container -----------------
 
+# Fields decoded by Parsed
+_LATITUDE = const(0)
+_LONGITUDE = const(1)
+_SPEED = const(2)
+_COURSE = const(3)
+_ALTITUDE = const(4)
+_NONE = const(-0x40000000) # Memo of an empty field
+_VERSION_MASK = const(0x3fffffff) # Versions stay small ints, wrapping to an even 0
+
+def _coordinate(s, starts, index):
+    # 1e-6 degrees from the field at index and the hemisphere after it, None if either is empty
+    start, end, hemisphere = starts[index], starts[index + 1] - 1, starts[index + 1]
+    if end <= start or starts[index + 2] - 1 <= hemisphere:
+        return None
+    value = coordinate(s, start, end)
+    if s[hemisphere] in (83, 87): # S, W
+        value = -value
+    return value
+
 class Parsed:
+    """ Last RMC and GGA sentences, as handed over by the GPS reader: the fields are only decoded when read,
+    into integers, and memoised until the next sentence. The float properties give them in the units used by
+    the screens.
+
+    The reader runs on the second core and uses decode(), which memoises nothing. It swaps its buffer with rmc
+    or gga between two increments of their version, which is odd during the swap. The properties are read by
+    the first core, a decoding started while the version is odd, or that sees it change, is done again."""
     def __init__(self):
-        self.speed = [0.0, 0.0, 0.0]   # [knots, mph, kmh]
-        self.course = 0.0
-        self.latitude  = (None,)       # latitude[0] -> decimal degrees
-        self.longitude = (None,)       # longitude[0] -> decimal degrees
-        self.altitude  = None          # optional (from GGA)
+        self.rmc = bytearray(_SENTENCE)
+        self.rmc_starts = array('H', bytes(2 * _FIELDS))
+        self.rmc_count = 0             # Fields of rmc, none yet
+        self.rmc_version = 0
+        self.gga = bytearray(_SENTENCE)
+        self.gga_starts = array('H', bytes(2 * _FIELDS))
+        self.gga_count = 0
+        self.gga_version = 0
+        self._values = array('i', bytes(4 * 5)) # Per field, see _LATITUDE...
+        self._versions = array('i', (-1, -1, -1, -1, -1))
         self.timestamp = 0             # ticks_ms when last valid fix was parsed
         self.fix_time  = 0             # ticks_ms (compat with your uses)
 
+    def decode(self, field):
+        # Integer value of field, None if empty
+        if field == _ALTITUDE: # GGA: $GPGGA,hhmmss.sss,lat,N,lon,E,fix,numsats,hdop,alt,M,geoid,M,...*CS
+            if self.gga_count < 10:
+                return None
+            start, end = self.gga_starts[9], self.gga_starts[10] - 1
+            return decimal(self.gga, start, end, 1) if end > start else None
+        # RMC: $GPRMC,hhmmss.sss,A,llll.ll,a,yyyyy.yy,a,x.x,x.x,ddmmyy,x.x,a*CS
+        # Field k is s[starts[k]:starts[k + 1] - 1]
+        s, starts = self.rmc, self.rmc_starts
+        if field == _SPEED:
+            return decimal(s, starts[7], starts[8] - 1, 3) if self.rmc_count >= 9 else 0
+        if field == _COURSE:
+            return decimal(s, starts[8], starts[9] - 1, 2) if self.rmc_count >= 9 else 0
+        if self.rmc_count < 9:
+            return None
+        return _coordinate(s, starts, 3 if field == _LATITUDE else 5)
+
+    def _memo(self, field):
+        while True:
+            version = self.gga_version if field == _ALTITUDE else self.rmc_version
+            if version & 1: # Being swapped
+                continue
+            if self._versions[field] == version:
+                value = self._values[field]
+                return None if value == _NONE else value
+            value = self.decode(field)
+            if version == (self.gga_version if field == _ALTITUDE else self.rmc_version):
+                self._values[field] = _NONE if value is None else value
+                self._versions[field] = version
+                return value
+
+    @property
+    def latitude_udeg(self):
+        # 1e-6 degrees
+        return self._memo(_LATITUDE)
+
+    @property
+    def longitude_udeg(self):
+        # 1e-6 degrees
+        return self._memo(_LONGITUDE)
+
+    @property
+    def speed_mkn(self):
+        # 1/1000 knots
+        return self._memo(_SPEED)
+
+    @property
+    def course_cdeg(self):
+        # 1/100 degrees
+        return self._memo(_COURSE)
+
+    @property
+    def altitude_dm(self):
+        # Decimeters
+        return self._memo(_ALTITUDE)
+
+    @property
+    def speed(self):
+        # [knots, mph, kmh]
+        kn = self.speed_mkn / 1000
+        return [kn, _knots_to_mph(kn), _knots_to_kmh(kn)]
+
+    @property
+    def course(self):
+        return self.course_cdeg / 100
+
+    @property
+    def latitude(self):
+        # latitude[0] -> decimal degrees
+        latitude = self.latitude_udeg
+        return (None if latitude is None else latitude / 1_000_000,)
+
+    @property
+    def longitude(self):
+        # longitude[0] -> decimal degrees
+        longitude = self.longitude_udeg
+        return (None if longitude is None else longitude / 1_000_000,)
+
+    @property
+    def altitude(self):
+        altitude = self.altitude_dm
+        return None if altitude is None else altitude / 10
+
 # ----------------- main class -----------------
 
 class GPS_handler:
@@ -58,8 +204,15 @@ class GPS_handler:
         self.uart = uart
         self.parsed = Parsed()
         self._has_fix = False          # RMC status == 'A'
-        self.previous_place = {'latitude': None, 'longitude': None, 'time': 0}
+        self.previous_place = {'latitude': None, 'longitude': None, 'time': 0} # 1e-6 degrees
         self.trip = 0
+        self.distance = Distance()
+        # Reader's buffers: UART bytes are read into chunk, framed into sentence, which starts is the
+        # fields' offsets of. Nothing is allocated once running
+        self._chunk = bytearray(_CHUNK)
+        self._sentence = bytearray(_SENTENCE)
+        self._starts = array('H', bytes(2 * _FIELDS))
+        self._framing = array('i', (0, 0, 0, 0))
         
     def has_fix(self):
         return self._has_fix
@@ -74,81 +227,68 @@ class GPS_handler:
                 self.get_distance()
         
     def read_NMEA(self):
+        # Sentences are framed from $ to their checksum, which is checked while scanning, and split into
+        # fields by offset: those of RMC and GGA are handed over to parsed, the others dropped
         while self.uart.any():
-            try:
-                line = self.uart.readline()
-                if not line:
-                    break
-                if not line.startswith(b'$'):
-                    continue
-                if not _nmea_checksum_ok(line):
+            n = self.uart.readinto(self._chunk, min(self.uart.any(), _CHUNK))
+            if not n:
+                break
+            while frame(self._chunk, n, self._sentence, self._framing):
+                count = split(self._sentence, self._framing[1], self._starts)
+                end = self._starts[1] - 1
+                if end < 3:
                     continue
+                kind = (self._sentence[end - 3] << 16) | (self._sentence[end - 2] << 8) | self._sentence[end - 1]
+                if kind == _RMC:
+                    self._parse_rmc(count)
+                elif kind == _GGA:
+                    self._parse_gga(count)
 
-                s = line.strip()
-                if s[3:6] == b'RMC' or s[2:5] == b'RMC':
-                    self._parse_rmc(s)
-                elif s[3:6] == b'GGA' or s[2:5] == b'GGA':
-                    self._parse_gga(s)
-            except (UnicodeError, MemoryError):
-                pass
+    def _parse_rmc(self, count):
+        # Only the status is read, the fields are decoded by Parsed when needed
+        if count < 9:
+            return
+        s = self._sentence
+        starts = self._starts
+        self._has_fix = s[starts[2]] == 65 and starts[3] - starts[2] == 2 # A
 
-    def _parse_rmc(self, s: bytes):
-        # RMC: $GPRMC,hhmmss.sss,A,llll.ll,a,yyyyy.yy,a,x.x,x.x,ddmmyy,x.x,a*CS
-        # We only need status, lat, N/S, lon, E/W, speed(kn), course
-        try:
-            body = s[1:s.rfind(b'*')]
-            parts = body.split(b',')
-
-            # Talker,RMC at parts[0]
-            status = parts[2:3][0] if len(parts) > 2 else b'V'
-            self._has_fix = (status == b'A')
-
-            lat = _dm_to_degrees(parts[3].decode(), parts[4:5][0].decode() if len(parts)>4 else '')
-            lon = _dm_to_degrees(parts[5].decode(), parts[6:7][0].decode() if len(parts)>6 else '')
-
-            spd_kn = float(parts[7]) if len(parts)>7 and parts[7] else 0.0
-            crs    = float(parts[8]) if len(parts)>8 and parts[8] else 0.0
-
-            self.parsed.latitude  = (lat,)
-            self.parsed.longitude = (lon,)
-            self.parsed.course    = crs
-            self.parsed.speed[0]  = spd_kn
-            self.parsed.speed[1]  = _knots_to_mph(spd_kn)
-            self.parsed.speed[2]  = _knots_to_kmh(spd_kn)
-
-            now = utime.ticks_ms()
-            self.parsed.timestamp = now
-            if self._has_fix:
-                self.parsed.fix_time = now
-
-            # Initialize previous_place on first valid fix
-            if self._has_fix and self.previous_place['latitude'] is None and lat is not None and lon is not None:
+        parsed = self.parsed
+        parsed.rmc_version = (parsed.rmc_version + 1) & _VERSION_MASK # Odd until swapped
+        self._sentence, parsed.rmc = parsed.rmc, self._sentence
+        self._starts, parsed.rmc_starts = parsed.rmc_starts, self._starts
+        parsed.rmc_count = count
+        parsed.rmc_version = (parsed.rmc_version + 1) & _VERSION_MASK
+
+        now = utime.ticks_ms()
+        parsed.timestamp = now
+        if self._has_fix:
+            parsed.fix_time = now
+
+        # Initialize previous_place on first valid fix
+        if self._has_fix and self.previous_place['latitude'] is None:
+            lat = parsed.decode(_LATITUDE)
+            lon = parsed.decode(_LONGITUDE)
+            if lat is not None and lon is not None:
                 self.previous_place['latitude']  = lat
                 self.previous_place['longitude']  = lon
                 self.previous_place['time'] = now
 
-        except Exception:
-            # Ignore malformed RMCs
-            pass
-
-    def _parse_gga(self, s: bytes):
-        # GGA: $GPGGA,hhmmss.sss,lat,N,lon,E,fix,numsats,hdop,alt,M,geoid,M,...*CS
-        try:
-            body = s[1:s.rfind(b'*')]
-            p = body.split(b',')
-            alt = float(p[9]) if len(p) > 9 and p[9] else None
-            self.parsed.altitude = alt
-            # fix quality p[6] could be used to refine _has_fix, but RMC status is enough for your usage
-        except Exception:
-            pass
+    def _parse_gga(self, count):
+        # fix quality p[6] could be used to refine _has_fix, but RMC status is enough for your usage
+        parsed = self.parsed
+        parsed.gga_version = (parsed.gga_version + 1) & _VERSION_MASK # Odd until swapped
+        self._sentence, parsed.gga = parsed.gga, self._sentence
+        self._starts, parsed.gga_starts = parsed.gga_starts, self._starts
+        parsed.gga_count = count
+        parsed.gga_version = (parsed.gga_version + 1) & _VERSION_MASK
     
     def get_distance(self):
-        lat = self.parsed.latitude[0]
-        lon = self.parsed.longitude[0]
+        lat = self.parsed.decode(_LATITUDE)
+        lon = self.parsed.decode(_LONGITUDE)
         if lat is None or lon is None:
             return
 
-        if self.parsed.speed[2] <= 10.0:
+        if self.parsed.decode(_SPEED) <= 5400: # 10kmh
             self.previous_place['time'] = self.parsed.fix_time
             return
 
@@ -160,19 +300,8 @@ class GPS_handler:
             self.previous_place['time'] = self.parsed.fix_time
             return
 
-        # Haversine (meters)
-        R = 6371000.0
-        phi1 = math.radians(prev_lat)
-        phi2 = math.radians(lat)
-        dphi = math.radians(lat - prev_lat)
-        dl   = math.radians(lon - prev_lon)
-        a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dl/2)**2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        meters = R * c
-        km = meters / 1000.0
-        self.trip += km
-    
-       
+        meters = self.distance.meters(prev_lat, prev_lon, lat, lon)
+        self.trip += meters / 1000.0
 
         # Move the previous point forward
         self.previous_place['latitude']  = lat
@@ -0,0 +1,103 @@
+import _thread
+import time
+import logging
+import profiler
+from mcp3208 import MCP3208
+
+
+class Samples:
+    """ One consistent set of acquired values."""
+    def __init__(self):
+        self.adc = [0] * 8 # Raw 12-bit codes, per MCP3208 channel
+        self.timestamp = 0 # ticks_ms of the acquisition
+
+    def copy_from(self, other):
+        for channel in range(8):
+            self.adc[channel] = other.adc[channel]
+        self.timestamp = other.timestamp
+
+
+class SampledADC(MCP3208):
+    """ Stands in for the MCP3208 on core 0, answering with the last published samples instead of using the SPI bus."""
+    def __init__(self, samples):
+        self.samples = samples
+
+    def read_value(self, pin):
+        return self.samples.adc[pin & 0x07]
+
+
+class Acquisition:
+    """ Acquisition engine, run on the RP2040's second core.
+
+    It owns the GPS UART, the MCP3208 and the injector state machines: each pass drains the GPS and
+    integrates the fuel (step_function) while holding lock, then samples every ADC channel into the back
+    buffer and swaps it with the front one. Core 0 gets a copy of the front buffer with read(), and must
+    hold lock to change the GPS or fuel state. If the second core can't be started, step() is run from
+    the scheduler instead."""
+    def __init__(self, adc, step_function, period = 20):
+        self.adc = adc
+        self.step_function = step_function
+        self.period = period # ms between two passes
+        self.lock = _thread.allocate_lock()
+        self._buffer_lock = _thread.allocate_lock()
+        self._buffers = (Samples(), Samples())
+        self._front = 0
+        self.running = False
+        self.threaded = False
+        self.beat = time.ticks_ms() # Last pass of the second core's loop
+
+    def attach(self, adc):
+        with self.lock:
+            self.adc = adc
+
+    def step(self):
+        with self.lock:
+            self.step_function()
+            back = self._buffers[self._front ^ 1]
+            for channel in range(8):
+                back.adc[channel] = self.adc.read_value(channel)
+        back.timestamp = time.ticks_ms()
+        with self._buffer_lock:
+            self._front ^= 1
+
+    def read(self, samples):
+        with self._buffer_lock:
+            samples.copy_from(self._buffers[self._front])
+
+    def _run(self):
+        logging.debug("> Acquisition running on core 1")
+        while self.running:
+            start = self.beat = time.ticks_ms()
+            start_us = time.ticks_us()
+            try:
+                self.step()
+            except Exception as e:
+                logging.exception(f"> Acquisition failed: {e}")
+            profiler.record('acquisition', start_us)
+            time.sleep_ms(max(0, self.period - time.ticks_diff(time.ticks_ms(), start)))
+        self.threaded = False
+        logging.debug("> Acquisition stopped")
+
+    def last_beat(self):
+        # For the watchdog, None when there is no second core to watch
+        return self.beat if self.threaded else None
+
+    def start(self):
+        self.running = True
+        try:
+            _thread.start_new_thread(self._run, ())
+            self.threaded = True
+        except OSError as e:
+            logging.error(f"> Could not start acquisition on core 1 ({e}), running it on core 0")
+        return self.threaded
+
+    def stop(self, timeout = 1000):
+        # The second core is free again once the current pass is over. Returns
+        # False if it is still running after timeout ms
+        self.running = False
+        deadline = time.ticks_add(time.ticks_ms(), timeout)
+        while self.threaded:
+            if time.ticks_diff(deadline, time.ticks_ms()) <= 0:
+                return False
+            time.sleep_ms(10)
+        return True
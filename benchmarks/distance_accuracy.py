@@ -0,0 +1,84 @@
+# Distance.meters (local projection) against the haversine: relative error
+# per step and over the whole track, and time per step. Run on the OBC,
+# from the repository's root:
+#
+#   mpremote mount . run benchmarks/distance_accuracy.py
+#
+# Replays the RMC fixes of the NMEA recordings listed in TRACKS, as logged
+# from the GPS UART, plus synthetic tracks at several latitudes.
+import math
+import time
+from GPS_parser import Distance, haversine
+
+TRACKS = ('benchmarks/track.nmea',)
+STEP = 1 # Fixes between two measures, GPS_handler measures about every second
+
+
+def recorded(path):
+    # [(lat, lon)] in 1e-6 degrees from the RMC sentences with a fix
+    def degrees(dm, hemisphere):
+        point = dm.find('.')
+        value = int(dm[:point - 2]) * 1_000_000 + round(float(dm[point - 2:]) * 1_000_000 / 60)
+        return -value if hemisphere in ('S', 'W') else value
+    fixes = []
+    with open(path) as file:
+        for line in file:
+            fields = line.split(',')
+            if fields[0][3:6] == 'RMC' and len(fields) > 6 and fields[2] == 'A':
+                fixes.append((degrees(fields[3], fields[4]), degrees(fields[5], fields[6])))
+    return fixes
+
+def synthetic(latitude, speed_kmh, turns):
+    # A loop of 600 fixes a second apart, from latitude (degrees), bending turns times a full circle
+    fixes = []
+    lat, lon = latitude * 1_000_000, 2_000_000
+    step = speed_kmh / 3.6 / 0.11119492664455873 # 1e-6 degrees per second
+    for i in range(600):
+        heading = 2 * math.pi * turns * i / 600
+        lat += step * math.cos(heading)
+        lon += step * math.sin(heading) / math.cos(math.radians(lat / 1_000_000))
+        fixes.append((int(lat), int(lon)))
+    return fixes
+
+def compare(name, fixes):
+    distance = Distance()
+    projected = exact = worst = 0
+    for i in range(STEP, len(fixes), STEP):
+        (lat1, lon1), (lat2, lon2) = fixes[i - STEP], fixes[i]
+        a = distance.meters(lat1, lon1, lat2, lon2)
+        b = haversine(lat1, lon1, lat2, lon2)
+        projected += a
+        exact += b
+        if b > 1:
+            worst = max(worst, abs(a - b) / b)
+    total = abs(projected - exact) / exact if exact else 0
+    print(f"{name:<24}{exact / 1000:>9.3f}km  track {total * 1e6:>6.1f}ppm  worst step {worst * 1e6:>6.1f}ppm  "
+          f"{distance.haversines} haversines")
+
+def timed(function, fixes):
+    # us per step
+    start = time.ticks_us()
+    for i in range(1, len(fixes)):
+        function(fixes[i - 1][0], fixes[i - 1][1], fixes[i][0], fixes[i][1])
+    return time.ticks_diff(time.ticks_us(), start) / (len(fixes) - 1)
+
+
+def main():
+    tracks = []
+    for path in TRACKS:
+        try:
+            tracks.append((path, recorded(path)))
+        except OSError:
+            print(f"No {path}, synthetic tracks only")
+    tracks += [("0N, 130kmh, straight", synthetic(0, 130, 0)),
+               ("48N, 50kmh, 3 loops", synthetic(48, 50, 3)),
+               ("60N, 130kmh, 1 loop", synthetic(60, 130, 1)),
+               ("70S, 90kmh, 2 loops", synthetic(-70, 90, 2))]
+    for name, fixes in tracks:
+        if len(fixes) > STEP:
+            compare(name, fixes)
+    fixes = tracks[-2][1]
+    print(f"us/step: haversine {timed(haversine, fixes):.1f}, projection {timed(Distance().meters, fixes):.1f}")
+
+
+main()
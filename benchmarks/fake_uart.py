@@ -0,0 +1,33 @@
+# Stands in for the GPS UART on the bench: replays recorded NMEA bytes, as
+# machine.UART's any() and readinto() would give them, without allocating.
+# respond(command) can play the receiver, its answer is read next.
+class FakeUART:
+    def __init__(self, data, loop = True, respond = None):
+        self.data = data
+        self.loop = loop # Replays data again once through
+        self.respond = respond
+        self.position = 0
+        self.written = bytearray()
+
+    def any(self):
+        if self.position >= len(self.data) and self.loop:
+            self.position = 0
+        return len(self.data) - self.position
+
+    def readinto(self, buf, nbytes = None):
+        n = min(self.any(), len(buf) if nbytes is None else nbytes)
+        for i in range(n):
+            buf[i] = self.data[self.position + i]
+        self.position += n
+        return n or None
+
+    def read(self, nbytes = None):
+        buf = bytearray(self.any() if nbytes is None else min(nbytes, self.any()))
+        return bytes(buf[:self.readinto(buf) or 0])
+
+    def write(self, buf):
+        self.written.extend(buf)
+        if self.respond is not None:
+            self.data = self.data[self.position:] + self.respond(bytes(buf))
+            self.position = 0
+        return len(buf)
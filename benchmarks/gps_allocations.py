@@ -0,0 +1,36 @@
+# Heap allocated by the GPS reader, replaying RMC, GGA and other sentences
+# through a fake UART. Run on the OBC, from the repository's root:
+#
+#   mpremote mount . run benchmarks/gps_allocations.py
+import gc
+import sys
+sys.path.append('benchmarks')
+from fake_uart import FakeUART
+from GPS_parser import GPS_handler
+
+RUNS = 100
+
+NMEA = (b"$GPRMC,123519.00,A,4807.03800,N,01131.00000,E,022.4,084.4,230394,003.1,W*44\r\n"
+        b"$GPGGA,123519.00,4807.03800,N,01131.00000,E,1,08,0.9,545.4,M,46.9,M,,*69\r\n"
+        b"$GPGSA,A,3,04,05,,09,12,,,24,,,,,2.5,1.3,2.1*39\r\n"
+        b"$GPVTG,084.4,T,,M,022.4,N,041.5,K,A*01\r\n")
+
+
+def main():
+    uart = FakeUART(NMEA, loop = False)
+    gps = GPS_handler(uart)
+    gps.read_NMEA() # Warms up anything allocated once
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    for _ in range(RUNS):
+        uart.position = 0
+        gps.read_NMEA()
+    after = gc.mem_alloc()
+    gc.enable()
+    print(f"{(after - before) // RUNS} bytes allocated per {len(NMEA)} bytes of NMEA")
+    print(f"fix {gps.has_fix()}, {gps.parsed.latitude_udeg} {gps.parsed.longitude_udeg}, "
+          f"{gps.parsed.speed_mkn}mkn, {gps.parsed.course_cdeg}cdeg, {gps.parsed.altitude_dm}dm")
+
+
+main()
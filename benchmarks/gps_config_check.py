@@ -0,0 +1,58 @@
+# Plays a PMTK and a UBX receiver through the fake UART to check
+# gps_config's commands and acks, then times the GPS reader on one second of
+# sentences: the receiver's defaults at 1Hz, against RMC and GGA at 10Hz.
+# Run on the OBC, from the repository's root:
+#
+#   mpremote mount . run benchmarks/gps_config_check.py
+import sys
+import time
+sys.path.append('benchmarks')
+import gps_config
+from fake_uart import FakeUART
+from GPS_parser import GPS_handler
+
+RMC = b"$GPRMC,123519.00,A,4807.03800,N,01131.00000,E,022.4,084.4,230394,003.1,W*44\r\n"
+GGA = b"$GPGGA,123519.00,4807.03800,N,01131.00000,E,1,08,0.9,545.4,M,46.9,M,,*69\r\n"
+OTHERS = (b"$GPGSA,A,3,04,05,,09,12,,,24,,,,,2.5,1.3,2.1*39\r\n"
+          b"$GPGSV,3,1,11,03,03,111,00,04,15,270,00,06,01,010,00,13,06,292,00*74\r\n"
+          b"$GPGSV,3,2,11,14,25,170,00,16,57,208,39,18,67,296,40,19,40,246,00*74\r\n"
+          b"$GPGSV,3,3,11,22,42,067,42,24,14,311,43,27,05,244,00,,,,*4D\r\n"
+          b"$GPVTG,084.4,T,,M,022.4,N,041.5,K,A*01\r\n"
+          b"$GPGLL,4807.03800,N,01131.00000,E,123519.00,A,A*66\r\n")
+
+
+def pmtk_receiver(command):
+    # Acknowledges $PMTKxxx with $PMTK001,xxx,3, amid its sentences
+    return RMC + gps_config.pmtk("PMTK001,{},3".format(command[5:8].decode()))
+
+def ubx_receiver(command):
+    # Acknowledges any UBX message with ACK-ACK
+    return GGA + gps_config.ubx(0x05, 0x01, command[2:4])
+
+def silent_receiver(command):
+    return RMC
+
+
+def check(name, respond, protocol, expected):
+    configured = gps_config.configure(FakeUART(b"", loop = False, respond = respond), protocol)
+    print(f"{name}: {'ok' if configured == expected else 'FAILED'}")
+
+def reader_time(sentences):
+    # us taken by read_NMEA on sentences
+    gps = GPS_handler(FakeUART(sentences, loop = False))
+    start = time.ticks_us()
+    gps.read_NMEA()
+    return time.ticks_diff(time.ticks_us(), start)
+
+
+def main():
+    check("PMTK", pmtk_receiver, 'PMTK', True)
+    check("UBX", ubx_receiver, 'UBX', True)
+    check("no ack", silent_receiver, 'PMTK', False)
+    defaults = RMC + GGA + OTHERS
+    minimal = (RMC + GGA) * 10
+    print(f"defaults at 1Hz: {len(defaults)} bytes/s, read in {reader_time(defaults)}us/s")
+    print(f"RMC+GGA at 10Hz: {len(minimal)} bytes/s, read in {reader_time(minimal)}us/s")
+
+
+main()
@@ -0,0 +1,54 @@
+# Time per call of each kernel, bytecode reference against the version
+# selected by kernels.py at import. Run on the OBC, from the repository's
+# root:
+#
+#   mpremote mount . run benchmarks/kernel_speedups.py
+import time
+from array import array
+import kernels
+from ht16k33_driver import GLYPHS
+
+RUNS = 1000
+
+SENTENCE = b"$GPRMC,123519.00,A,4807.03800,N,01131.00000,E,022.4,084.4,230394,003.1,W*44\r\n"
+BODY = SENTENCE[1:SENTENCE.rfind(b'*')]
+RESPONSE = bytearray((0x01, 0xa5, 0xc0))
+BUFFER = bytearray(16)
+
+# frame returns the sentence, then the end of line on the next call
+ARGUMENTS = {
+    'frame': (SENTENCE, len(SENTENCE), bytearray(96), array('i', (0, 0, 0, 0))),
+    'split': (BODY, len(BODY), array('H', bytes(40))),
+    'decimal': (b"084.4", 0, 5, 2),
+    'coordinate': (b"4807.03800", 0, 10),
+    'bytes_toint': (0xfe, 0x0c),
+    'bcdtodec': (0x59,),
+    'dectobcd': (59,),
+    'adc_code': (RESPONSE,),
+    'put_glyph': (BUFFER, 3, GLYPHS, ord('W')),
+}
+
+
+def timed(function, arguments):
+    # us per call, the loop's own cost included
+    start = time.ticks_us()
+    for _ in range(RUNS):
+        function(*arguments)
+    return time.ticks_diff(time.ticks_us(), start) / RUNS
+
+
+def main():
+    if not kernels.compiled:
+        print("No native emitter: the kernels run as bytecode")
+    print(f"{'us/call':<12}{'bytecode':>10}{'selected':>10}{'speedup':>9}")
+    for name, reference in kernels.reference.items():
+        selected = getattr(kernels, name)
+        arguments = ARGUMENTS[name]
+        if reference(*arguments) != selected(*arguments):
+            print(f"{name}: results differ")
+        before = timed(reference, arguments)
+        after = timed(selected, arguments)
+        print(f"{name:<12}{before:>10.2f}{after:>10.2f}{before / after:>8.1f}x")
+
+
+main()
@@ -0,0 +1,108 @@
+# Heap allocated by one sensor reading, the former float conversions against
+# the integer ones. Run on the OBC, from the repository's root:
+#
+#   mpremote mount . run benchmarks/sensor_allocations.py
+#
+# The ADC is faked: only the conversions are measured, not the SPI bus.
+import gc
+from math import log
+from temperature import Temperature
+from mcp3208 import MCP3208
+
+RUNS = 100
+
+
+class FakeADC(MCP3208):
+    def __init__(self):
+        self.code = 0
+
+    def read_value(self, pin):
+        self.code = (self.code + 37) & 0xfff
+        return self.code
+
+
+# The conversions as they were before fixed point
+def float_pressure(adc):
+    bar_pressure = 2.59 * adc.read_voltage(1) - 1.29
+    if bar_pressure < 0.2:
+        bar_pressure = 0
+    return round(bar_pressure, 1)
+
+def float_voltage(adc):
+    return adc.read_voltage(2) * 3
+
+def float_fuel(adc):
+    fuel_voltage = 0.920 * 3 * adc.read_voltage(4) - 0.035
+    cal = [(3.80, 5.0), (3.08, 15.0), (1.26, 35.0), (0.46, 45.2), (0.02, 55.0)]
+    if fuel_voltage >= cal[0][0]:
+        return cal[0][1]
+    if fuel_voltage <= cal[-1][0]:
+        return cal[-1][1]
+    for i in range(len(cal) - 1):
+        v_hi, l_hi = cal[i]
+        v_lo, l_lo = cal[i + 1]
+        if v_lo <= fuel_voltage <= v_hi:
+            return l_lo + (fuel_voltage - v_lo) / (v_hi - v_lo) * (l_hi - l_lo)
+    return cal[-1][1]
+
+def float_temperature(adc):
+    # Water sensor
+    adc_voltage = adc.read_voltage(7)
+    try:
+        RNTC = (adc_voltage / (5 - adc_voltage)) * 4700
+        return 1 / (1.51646e-3 + 2.397145e-4 * log(RNTC) + 0.20817e-7 * log(RNTC)**3) - 273.15
+    except (ZeroDivisionError, ValueError):
+        return -51.15
+
+
+# The same through the integer path, as in obc.py and temperature.py
+def fixed_pressure(adc):
+    millibar = 259 * adc.read_millivolts(1) // 100 - 1290
+    return millibar if millibar >= 200 else 0
+
+def fixed_voltage(adc):
+    return 3 * adc.read_millivolts(2)
+
+def fixed_fuel(adc):
+    fuel_millivolts = 3 * adc.read_millivolts(4) * 920 // 1000 - 35
+    cal = ((3800, 500), (3080, 1500), (1260, 3500), (460, 4520), (20, 5500))
+    if fuel_millivolts >= cal[0][0]:
+        return cal[0][1]
+    if fuel_millivolts <= cal[-1][0]:
+        return cal[-1][1]
+    for i in range(len(cal) - 1):
+        v_hi, l_hi = cal[i]
+        v_lo, l_lo = cal[i + 1]
+        if v_lo <= fuel_millivolts <= v_hi:
+            return l_lo + (fuel_millivolts - v_lo) * (l_hi - l_lo) // (v_hi - v_lo)
+    return cal[-1][1]
+
+
+def allocated(function, adc):
+    # Bytes per call, the collector held off
+    function(adc) # Warms up anything allocated once
+    gc.collect()
+    gc.disable()
+    before = gc.mem_alloc()
+    for _ in range(RUNS):
+        function(adc)
+    after = gc.mem_alloc()
+    gc.enable()
+    return (after - before) // RUNS
+
+
+def main():
+    adc = FakeADC()
+    sensor = Temperature('water', adc)
+    cases = (
+        ('pressure', float_pressure, fixed_pressure),
+        ('voltage', float_voltage, fixed_voltage),
+        ('fuel', float_fuel, fixed_fuel),
+        ('temperature', float_temperature, lambda adc: sensor.read_centidegrees()),
+    )
+    print(f"{'bytes/reading':<14}{'float':>8}{'fixed':>8}")
+    for name, before, after in cases:
+        print(f"{name:<14}{allocated(before, adc):>8}{allocated(after, adc):>8}")
+
+
+main()
@@ -0,0 +1,84 @@
+# Cross-compiles the firmware's modules to .mpy bytecode, run on the host
+# before publishing a release:
+#
+#   python build_mpy.py [path/to/mpy-cross]
+#
+# mpy-cross must come from the MicroPython release flashed on the OBCs
+# (pip install mpy-cross==<version>). Its bytecode version, and the
+# sub-version and architecture of the machine code (kernels_native.py), are
+# recorded as "mpy_abi" in version.json, in the layout of
+# sys.implementation._mpy: OTAUpdater only fetches the .mpy files from mpy/
+# when it matches the device's, and falls back to the sources otherwise.
+# main.py stays a source stub, it is what the firmware boots from.
+# The files of the release are listed as "files" in version.json, the
+# wireless update fetches those.
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+SOURCE_ONLY = ("main.py", "build_mpy.py", "hardware_tester.py")
+NOT_RELEASED = ("build_mpy.py", "hardware_tester.py") # Run from a computer, or after assembly
+PACKAGES = ("FOTA",) # Released with all their files, the web pages of the setup server included
+OUTPUT_DIR = "mpy"
+
+
+def read_abi(path):
+    # As sys.implementation._mpy: the bytecode version in the low byte, then
+    # the sub-version and architecture, which are 0 without machine code
+    with open(path, "rb") as f:
+        header = f.read(4)
+    if header[0] != ord("M"):
+        raise ValueError(f"{path} is not a .mpy file")
+    return header[1] | header[2] << 8
+
+
+def release_files():
+    # What the wireless update fetches, as device paths. Settings and logs stay on the device
+    files = [f for f in os.listdir(".") if f.endswith(".py") and f not in NOT_RELEASED]
+    for package in PACKAGES:
+        for directory, subdirectories, filenames in os.walk(package):
+            subdirectories[:] = [d for d in subdirectories if d != "__pycache__"]
+            files.extend(directory.replace(os.sep, "/") + "/" + f for f in filenames if not f.startswith("."))
+    return sorted(files) + ["version.json"]
+
+
+def main():
+    mpy_cross = sys.argv[1] if len(sys.argv) > 1 else shutil.which("mpy-cross")
+    if mpy_cross is None:
+        sys.exit("mpy-cross not found, pass its path or pip install mpy-cross")
+    root = os.path.dirname(os.path.abspath(__file__))
+    os.chdir(root)
+
+    files = release_files()
+    bytecode = None
+    native = 0
+    for filename in files:
+        if not filename.endswith(".py") or filename in SOURCE_ONLY:
+            continue
+        output = os.path.join(OUTPUT_DIR, filename[:-3] + ".mpy")
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        # armv6m: the RP2040's Cortex-M0+, for the @micropython.native/viper functions
+        subprocess.run([mpy_cross, "-march=armv6m", "-o", output, filename], check=True)
+        file_abi = read_abi(output)
+        if bytecode is not None and file_abi & 0xff != bytecode:
+            sys.exit(f"{output} has bytecode version {file_abi & 0xff}, expected {bytecode}")
+        bytecode = file_abi & 0xff
+        if file_abi >> 8:
+            if native and file_abi >> 8 != native:
+                sys.exit(f"{output} has machine code for {file_abi >> 8:#x}, expected {native:#x}")
+            native = file_abi >> 8
+        print(f"{filename} -> {output}")
+
+    with open("version.json") as f:
+        version = json.load(f)
+    version["mpy_abi"] = None if bytecode is None else bytecode | native << 8
+    version["files"] = files
+    with open("version.json", "w") as f:
+        json.dump(version, f)
+    print(f"version.json: {version}")
+
+
+if __name__ == "__main__":
+    main()
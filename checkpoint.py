@@ -0,0 +1,109 @@
+import struct
+import time
+import math
+import os
+import logging
+from memory import crc32
+
+checkpoint_file = 'trip.bin'
+
+# Each slot: format, sequence number, odometer it was taken against (km),
+# trip (km), consumed fuel (L), CRC32 of the previous fields.
+# Format 1 had no format field and stored the odometer as a float32, a
+# file of that size is still read once, then rewritten in the new format.
+_SLOT_FORMAT = 2
+_SLOT = '<BIdffI'
+_SLOT_SIZE = struct.calcsize(_SLOT)
+_SLOT_V1 = '<IfffI'
+_SLOT_V1_SIZE = struct.calcsize(_SLOT_V1)
+
+
+class TripCheckpoint:
+    """ Periodically saves the ongoing trip and fuel consumption so they survive a brownout or a reset.
+
+    Checkpoints rotate across a fixed number of slots of the same file, so a write cut by a power loss
+    can only ever damage one slot, the newest valid one is used at boot."""
+    def __init__(self, slots = 8, distance = 1.0, period = 5 * 60 * 1000):
+        self.slots = slots
+        self.distance = distance # km driven between two checkpoints
+        self.period = period     # ms between two checkpoints, if the trip or fuel changed
+        self.sequence = 0
+        self.last_saved = {'trip': 0, 'consumed_fuel': 0, 'time': time.ticks_ms()}
+        self._buf = bytearray(_SLOT_SIZE)
+        self._rewrite = False # The file is in format 1
+
+    def restore(self):
+        """ Returns (odometer, trip, consumed_fuel) from the newest valid slot, or None."""
+        try:
+            size = os.stat(checkpoint_file)[6]
+        except OSError:
+            return None
+        self._rewrite = size == _SLOT_V1_SIZE * self.slots
+        slot_format, slot_size = (_SLOT_V1, _SLOT_V1_SIZE) if self._rewrite else (_SLOT, _SLOT_SIZE)
+        buf = memoryview(self._buf)[:slot_size]
+        newest = None
+        try:
+            with open(checkpoint_file, 'rb') as f:
+                for slot in range(self.slots):
+                    if f.readinto(buf) != slot_size:
+                        break
+                    fields = struct.unpack(slot_format, buf)
+                    if fields[-1] != crc32(buf[:slot_size - 4]):
+                        continue
+                    if not self._rewrite:
+                        if fields[0] != _SLOT_FORMAT:
+                            continue
+                        fields = fields[1:]
+                    if newest is None or fields[0] > newest[0]:
+                        newest = fields[:4]
+        except OSError:
+            return None
+        if newest is None:
+            logging.warn(f"> No valid checkpoint in {checkpoint_file}")
+            return None
+        sequence, odometer, trip, consumed_fuel = newest
+        # Fuel burnt before moving off is kept, only impossible values are dropped
+        if not (math.isfinite(trip) and trip >= 0):
+            logging.warn(f"> Checkpoint {sequence} has an invalid trip {trip}, dropping it")
+            trip = 0
+        if not (math.isfinite(consumed_fuel) and consumed_fuel >= 0):
+            logging.warn(f"> Checkpoint {sequence} has an invalid fuel {consumed_fuel}, dropping it")
+            consumed_fuel = 0
+        newest = (sequence, odometer, trip, consumed_fuel)
+        self.sequence = newest[0]
+        self.last_saved['trip'] = newest[2]
+        self.last_saved['consumed_fuel'] = newest[3]
+        logging.info(f"> Restored checkpoint {newest}")
+        return newest[1:]
+
+    def save(self, odometer, trip, consumed_fuel):
+        self.sequence += 1
+        struct.pack_into(_SLOT, self._buf, 0, _SLOT_FORMAT, self.sequence, odometer, trip, consumed_fuel, 0)
+        struct.pack_into('<I', self._buf, _SLOT_SIZE - 4, crc32(memoryview(self._buf)[:_SLOT_SIZE - 4]))
+        f = None
+        if not self._rewrite:
+            try:
+                f = open(checkpoint_file, 'r+b')
+            except OSError:
+                pass
+        if f is None:
+            f = open(checkpoint_file, 'wb')
+            f.write(bytearray(_SLOT_SIZE * self.slots))
+            self._rewrite = False
+        with f:
+            f.seek((self.sequence % self.slots) * _SLOT_SIZE)
+            f.write(self._buf)
+        self.last_saved['trip'] = trip
+        self.last_saved['consumed_fuel'] = consumed_fuel
+        self.last_saved['time'] = time.ticks_ms()
+        logging.debug(f"> Checkpoint {self.sequence}: {trip}km, {consumed_fuel}L")
+
+    def update(self, odometer, trip, consumed_fuel):
+        """ Saves a checkpoint if enough distance was driven or enough time elapsed since the last one."""
+        if trip - self.last_saved['trip'] >= self.distance:
+            self.save(odometer, trip, consumed_fuel)
+        elif time.ticks_diff(time.ticks_ms(), self.last_saved['time']) >= self.period:
+            if trip != self.last_saved['trip'] or consumed_fuel != self.last_saved['consumed_fuel']:
+                self.save(odometer, trip, consumed_fuel)
+            else:
+                self.last_saved['time'] = time.ticks_ms()
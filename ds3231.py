@@ -29,6 +29,7 @@
 
 from micropython import const
 import logging
+from kernels import bcdtodec, dectobcd # Binary coded decimal (BCD) to decimal, and back
 
 DATETIME_REG    = const(0) # 7 bytes
 ALARM1_REG      = const(7) # 5 bytes
@@ -38,14 +39,6 @@ STATUS_REG      = const(15)
 AGING_REG       = const(16)
 TEMPERATURE_REG = const(17) # 2 bytes
 
-def dectobcd(decimal):
-    """Convert decimal to binary coded decimal (BCD) format"""
-    return (decimal // 10) << 4 | (decimal % 10)
-
-def bcdtodec(bcd):
-    """Convert binary coded decimal to decimal"""
-    return ((bcd >> 4) * 10) + (bcd & 0x0F)
-
 
 class DS3231:
     """ DS3231 RTC driver.
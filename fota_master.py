@@ -7,6 +7,7 @@ import utime
 import _thread
 import network
 import logging
+import profiler
 
 def machine_reset():
     utime.sleep(1)
@@ -59,6 +60,16 @@ def setup_mode():
         _thread.start_new_thread(machine_reset, ())
         return render_template(f"{AP_TEMPLATE_PATH}/configured.html", ssid = request.form["ssid"])
         
+    def ap_profile(request):
+        # Stage timings recorded before entering setup mode, see profiler.py
+        import governor
+        return profiler.report() + "\n" + governor.report(), 200, "text/plain"
+
+    def ap_crashes(request):
+        # Stages the watchdog found late or reset the OBC on, see watchdog.py
+        from watchdog import read_crash_records
+        return json.dumps(read_crash_records()), 200, "application/json"
+
     def ap_catch_all(request):
         if request.headers.get("host") != AP_DOMAIN:
             return render_template(f"{AP_TEMPLATE_PATH}/redirect.html", domain = AP_DOMAIN)
@@ -67,6 +78,8 @@ def setup_mode():
 
     server.add_route("/", handler = ap_index, methods = ["GET"])
     server.add_route("/configure", handler = ap_configure, methods = ["POST"])
+    server.add_route("/profile", handler = ap_profile, methods = ["GET"])
+    server.add_route("/crashes", handler = ap_crashes, methods = ["GET"])
     server.set_callback(ap_catch_all)
 
     ap = access_point(AP_NAME)
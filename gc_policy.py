@@ -0,0 +1,70 @@
+import gc
+import time
+import logging
+import profiler
+
+# Instead of a full collection on every pass, the heap is collected:
+# - when less than _low_watermark bytes are free, or are expected to be
+#   within _horizon ms at the current allocation rate,
+# - when at least _idle_alloc bytes were allocated since the last
+#   collection and the next frame is far enough away to absorb the pause,
+# - by MicroPython itself once _threshold bytes were allocated since the
+#   last collection, as a backstop if the gc stage falls behind.
+_threshold = 50000 # Lowish, limits fragmentation: the OTA download needs relatively large blocks
+_low_watermark = 24 * 1024
+_idle_alloc = 8 * 1024
+_horizon = 500 # ms
+
+_collected_at = 0 # mem_alloc() right after the last collection
+_last_alloc = 0
+_last_ticks = 0
+_alloc_rate = 0 # bytes/s, smoothed. An int: a float would be allocated at each step
+_pause = 5      # ms, smoothed duration of the last collections
+collections = 0
+
+def init(threshold = None, low_watermark = None):
+    global _threshold, _low_watermark, _collected_at, _last_alloc, _last_ticks
+    if threshold is not None:
+        _threshold = threshold
+    if low_watermark is not None:
+        _low_watermark = low_watermark
+    gc.threshold(_threshold)
+    _collected_at = _last_alloc = gc.mem_alloc()
+    _last_ticks = time.ticks_ms()
+    logging.debug(f"> GC threshold {_threshold}B, watermark {_low_watermark}B")
+
+def collect():
+    """ Collects now, timing the pause."""
+    global _pause, _collected_at, _last_alloc, collections
+    start = time.ticks_us()
+    gc.collect()
+    duration = time.ticks_diff(time.ticks_us(), start)
+    profiler.add('gc_pause', duration)
+    _pause = (3 * _pause + duration // 1000) // 4
+    _collected_at = _last_alloc = gc.mem_alloc()
+    collections += 1
+
+def collect_if_low(low_watermark = None):
+    # For code allocating in a loop, collects only if the heap runs low
+    if gc.mem_free() < (_low_watermark if low_watermark is None else low_watermark):
+        collect()
+        return True
+    return False
+
+def step(slack = 0):
+    """ Run by the gc stage, slack being the ms left before the next stage is due."""
+    global _collected_at, _last_alloc, _last_ticks, _alloc_rate
+    alloc = gc.mem_alloc()
+    now = time.ticks_ms()
+    if alloc < _last_alloc: # Collected by the threshold in between
+        _collected_at = alloc
+    else:
+        elapsed = time.ticks_diff(now, _last_ticks)
+        if elapsed > 0:
+            _alloc_rate = (3 * _alloc_rate + (alloc - _last_alloc) * 1000 // elapsed) // 4
+    _last_alloc = alloc
+    _last_ticks = now
+    if gc.mem_free() - _low_watermark < _alloc_rate * _horizon // 1000:
+        collect()
+    elif alloc - _collected_at >= _idle_alloc and slack > 2 * _pause:
+        collect()
@@ -0,0 +1,78 @@
+import time
+import logging
+from machine import freq
+
+# System clock per level, in Hz. The RP2040 is rated up to 133MHz, its
+# peripherals and the PIO are clocked from it: every change is followed by
+# the callbacks registered with on_change(), which re-apply the baud rates
+# and rescale the PIO counts.
+LEVELS = {
+    'idle': 48_000_000,    # Powered off
+    'static': 80_000_000,  # Screens only refreshed for the clock or a stored value
+    'normal': 125_000_000, # The RP2040's default
+    'boost': 133_000_000,  # Timing (lap timer, acceleration) and software update
+}
+
+_level = None
+_since = time.ticks_ms()
+_time_at = {} # ms spent at each level
+_callbacks = []
+_lock = None
+
+def init(lock = None):
+    # lock is held during each change, keeping the acquisition engine off the buses
+    global _lock
+    _lock = lock
+
+def on_change(callback):
+    # callback(frequency) is run after each change, lock held
+    _callbacks.append(callback)
+
+def _account():
+    global _since
+    now = time.ticks_ms()
+    if _level is not None:
+        _time_at[_level] = _time_at.get(_level, 0) + time.ticks_diff(now, _since)
+    _since = now
+
+def _apply(level):
+    # Returns False if the PLL can't reach the level's frequency
+    try:
+        if _lock is None:
+            _set_frequency(LEVELS[level])
+        else:
+            with _lock:
+                _set_frequency(LEVELS[level])
+    except ValueError as e:
+        logging.error(f"> Could not set {level} ({LEVELS[level]}Hz): {e}")
+        return False
+    return True
+
+def _set_frequency(frequency):
+    freq(frequency)
+    for callback in _callbacks:
+        callback(frequency)
+
+def set_level(level):
+    global _level
+    if level == _level:
+        return
+    _account()
+    if _apply(level):
+        logging.debug(f"> Clock set to {level}, {freq() // 1_000_000}MHz")
+        _level = level
+
+def check():
+    # Applies the level again if the clock was changed behind the governor's back (light sleep)
+    if _level is not None and freq() != LEVELS[_level]:
+        _apply(_level)
+
+def level():
+    return _level
+
+def report():
+    """ Returns one line per level: time spent there, and its share."""
+    _account()
+    total = sum(_time_at.values()) or 1
+    return "\n".join(f"{level} ({LEVELS[level] // 1_000_000}MHz): {_time_at[level] // 1000}s "
+                     f"({100 * _time_at[level] // total}%)" for level in LEVELS if level in _time_at)
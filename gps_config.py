@@ -0,0 +1,83 @@
+import time
+import logging
+
+# Configures the GPS receiver through its proprietary commands, PMTK for the
+# MediaTek based ones, UBX for the u-blox: only RMC and GGA are sent, at up to
+# 10 fixes per second. The settings are kept in the receiver's RAM, so this is
+# done at each power on. Needs the UART's TX line to reach the receiver.
+
+PROTOCOLS = ('PMTK', 'UBX')
+_ACK_TIMEOUT = 500 # ms
+_ATTEMPTS = 2
+
+# UBX ids of the NMEA sentences, in class 0xf0, and whether they're kept
+_UBX_NMEA = (('GGA', 0x00, True),
+             ('GLL', 0x01, False),
+             ('GSA', 0x02, False),
+             ('GSV', 0x03, False),
+             ('RMC', 0x04, True),
+             ('VTG', 0x05, False))
+
+def pmtk(body):
+    # "$<body>*<checksum>\r\n"
+    checksum = 0
+    for char in body:
+        checksum ^= ord(char)
+    return "${}*{:02X}\r\n".format(body, checksum).encode()
+
+def ubx(message_class, message_id, payload):
+    message = bytearray((0xb5, 0x62, message_class, message_id, len(payload) & 0xff, len(payload) >> 8))
+    message.extend(payload)
+    ck_a = ck_b = 0
+    for byte in message[2:]: # Fletcher checksum, of all but the sync chars
+        ck_a = (ck_a + byte) & 0xff
+        ck_b = (ck_b + ck_a) & 0xff
+    message.append(ck_a)
+    message.append(ck_b)
+    return bytes(message)
+
+def commands(protocol, rate):
+    # [(name, command, expected ack)], rate in fixes per second
+    period = 1000 // rate
+    if protocol == 'PMTK':
+        # PMTK314: per sentence type, sent every n fixes, in the order GLL, RMC, VTG, GGA, GSA, GSV...
+        return [('sentences', pmtk("PMTK314,0,1,0,1" + ",0" * 15), b"$PMTK001,314,3"),
+                ('rate', pmtk("PMTK220,{}".format(period)), b"$PMTK001,220,3")]
+    result = []
+    for sentence, message_id, kept in _UBX_NMEA:
+        # CFG-MSG: sentence sent every n fixes, on the current port. Acknowledged by ACK-ACK
+        result.append((sentence, ubx(0x06, 0x01, bytes((0xf0, message_id, int(kept)))), ubx(0x05, 0x01, b"\x06\x01")))
+    # CFG-RATE: measurement period in ms, one fix per measurement, GPS time
+    result.append(('rate', ubx(0x06, 0x08, bytes((period & 0xff, period >> 8, 1, 0, 1, 0))),
+                   ubx(0x05, 0x01, b"\x06\x08")))
+    return result
+
+def wait_for(uart, expected, timeout = _ACK_TIMEOUT):
+    # True once expected was received, among the sentences, False after timeout ms
+    received = b''
+    deadline = time.ticks_add(time.ticks_ms(), timeout)
+    while time.ticks_diff(deadline, time.ticks_ms()) > 0:
+        if uart.any():
+            received = (received + uart.read(uart.any()))[-128:]
+            if expected in received:
+                return True
+        else:
+            time.sleep_ms(10)
+    return False
+
+def configure(uart, protocol = 'PMTK', rate = 10):
+    """ Returns True if the receiver acknowledged every command."""
+    if protocol not in PROTOCOLS:
+        raise ValueError(f"Unknown GPS protocol {protocol}")
+    configured = True
+    for name, command, ack in commands(protocol, rate):
+        for attempt in range(_ATTEMPTS):
+            uart.write(command)
+            if wait_for(uart, ack):
+                break
+        else:
+            logging.error(f"> GPS did not acknowledge its {name} ({protocol})")
+            configured = False
+    if configured:
+        logging.debug(f"> GPS set to RMC and GGA at {rate}Hz ({protocol})")
+    return configured
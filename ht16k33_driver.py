@@ -1,6 +1,7 @@
 from micropython import const
 import framebuf
 import logging
+from kernels import put_glyph
   
 # Ordre : 0 DP N M L K J H G2 G1 F E D C B A
 
@@ -103,6 +104,7 @@ CHARS = (
     0b00111111, 0b11111111,
 
 )
+GLYPHS = bytes(CHARS) # For put_glyph's byte access
 
 NUMBERS = (
     0x3F,  # 0
@@ -203,9 +205,7 @@ class Seg14x4(HT16K33):
         if char == '.':
             self.buffer[index * 2 + 1] |= 0b01000000
             return
-        c = ord(char) * 2 - 64
-        self.buffer[index * 2] = CHARS[1 + c]
-        self.buffer[index * 2 + 1] = CHARS[c]
+        put_glyph(self.buffer, index, GLYPHS, ord(char))
 
     def put_text(self, text):
         k = len(text)
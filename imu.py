@@ -1,6 +1,7 @@
 from utime import sleep_ms
 from machine import I2C
 from vector3d import Vector3d
+from kernels import bytes_toint # Two bytes to a signed integer (big endian)
 
 
 class MPUException(OSError):
@@ -10,17 +11,6 @@ class MPUException(OSError):
     pass
 
 
-def bytes_toint(msb, lsb):
-    '''
-    Convert two bytes to signed integer (big endian)
-    for little endian reverse msb, lsb arguments
-    Can be used in an interrupt handler
-    '''
-    if not msb & 0x80:
-        return msb << 8 | lsb  # +ve
-    return - (((msb ^ 255) << 8) | (lsb ^ 255) + 1)
-
-
 class MPU6050(object):
     '''
     Module for InvenSense IMUs. Base class implements MPU6050 6DOF sensor, with
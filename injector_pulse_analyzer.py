@@ -1,7 +1,10 @@
-from rp2 import PIO, asm_pio    
-    
-    
-@asm_pio(set_init=PIO.IN_LOW, autopush=True, push_thresh=32)
+from rp2 import PIO, asm_pio
+from array import array
+import time
+from machine import freq
+
+
+@asm_pio(set_init=PIO.IN_LOW, autopush=True, push_thresh=32, fifo_join=PIO.JOIN_RX)
 def period():
     wrap_target()
     set(x, 0)
@@ -22,7 +25,7 @@ def period():
     
     
     
-@asm_pio(set_init=PIO.IN_LOW, autopush=True, push_thresh=32)
+@asm_pio(set_init=PIO.IN_LOW, autopush=True, push_thresh=32, fifo_join=PIO.JOIN_RX)
 def pulse_width():
     wrap_target()
     set(x, 0)
@@ -36,6 +39,143 @@ def pulse_width():
     irq(0)
     wrap()
 
-    
-    
 
+# on_time and pulse_count keep running totals in Y, counted down from 0 and
+# wrapping at 32 bits. Writing a non-zero word to the TX FIFO requests the
+# current total, pushed without blocking when the SM next sees the pin low.
+# pull(noblock) copies X to the OSR when the TX FIFO is empty, X is kept at
+# 0 so that reads as "no request".
+@asm_pio(fifo_join=PIO.JOIN_NONE)
+def on_time():
+    set(y, 0)
+    wrap_target()
+    label('low')
+    pull(noblock)
+    mov(x, osr)
+    jmp(not_x, 'idle')
+    mov(isr, y)
+    push(noblock)
+    set(x, 0)
+    label('idle')
+    jmp(pin, 'high')
+    jmp('low')
+    label('high')
+    jmp(y_dec, 'next')  # unconditional, 2 cycles per count
+    label('next')
+    jmp(pin, 'high')  # while pin is high
+    wrap()
+
+
+@asm_pio(fifo_join=PIO.JOIN_NONE)
+def pulse_count():
+    set(y, 0)
+    wrap_target()
+    label('low')
+    pull(noblock)
+    mov(x, osr)
+    jmp(not_x, 'idle')
+    mov(isr, y)
+    push(noblock)
+    set(x, 0)
+    label('idle')
+    jmp(pin, 'rise')
+    jmp('low')
+    label('rise')
+    jmp(y_dec, 'high')  # unconditional
+    label('high')
+    jmp(pin, 'high')  # while pin is high
+    wrap()
+
+
+# The PIO runs from the system clock: the duration of a count follows it
+_count_ms = 3000 / freq()         # period and pulse_width, 3 cycles per count
+_on_time_count_ms = 2000 / freq() # on_time, 2 cycles per count
+_frequency_changes = 0 # Counts taken across a change can't be converted, see InjectorCounter
+
+def update_frequency():
+    # Must be called after the system clock changes
+    global _count_ms, _on_time_count_ms, _frequency_changes
+    _count_ms = 3000 / freq()
+    _on_time_count_ms = 2000 / freq()
+    _frequency_changes += 1
+
+def counts_to_ms(v):
+    # The programs count down from 0, 24ns per count at 125MHz
+    return (1 + (v ^ 0xffffffff)) * _count_ms
+
+
+class PulseSampler:
+    """ Collects every pulse measured by the pulse_width and period state machines.
+
+    The pulse_width program raises an IRQ after each pulse: the handler drains both FIFOs into a ring,
+    drain() then hands the pending pulses over without waiting for new ones."""
+    def __init__(self, sm_width, sm_period, size = 32):
+        self.sm_width = sm_width
+        self.sm_period = sm_period
+        self.size = size
+        self.widths = array('I', [0] * size)
+        self.periods = array('I', [0] * size)
+        self.head = 0 # Next slot written by the IRQ handler
+        self.tail = 0 # Next slot read by drain()
+        self.last_period = 0
+        self.dropped = 0
+        self.sm_width.irq(self._irq_handler)
+
+    def _irq_handler(self, sm):
+        while self.sm_period.rx_fifo():
+            self.last_period = self.sm_period.get()
+        while self.sm_width.rx_fifo():
+            width = self.sm_width.get()
+            head = (self.head + 1) % self.size
+            if head == self.tail: # Ring full, drain() is late
+                self.dropped += 1
+                continue
+            self.widths[self.head] = width
+            self.periods[self.head] = self.last_period
+            self.head = head
+
+    def drain(self, handler):
+        # Calls handler(pulse_width, period), in ms, for each pulse received since the last call
+        while self.tail != self.head:
+            period = self.periods[self.tail]
+            if period:
+                handler(counts_to_ms(self.widths[self.tail]), counts_to_ms(period))
+            self.tail = (self.tail + 1) % self.size
+
+
+class InjectorCounter:
+    """ Reads the injector open time and pulse count totalled by the on_time and pulse_count state machines.
+
+    No CPU work is done per pulse: drain() collects the answer to the request it made on its previous call
+    and hands over the difference between the two totals, so nothing is lost however late it is called.
+    Except when the system clock changed in between: the open time was then counted at two rates, that
+    interval is dropped."""
+    def __init__(self, sm_on_time, sm_pulse_count):
+        self.sm_on_time = sm_on_time
+        self.sm_pulse_count = sm_pulse_count
+        self.pulses = 0 # Since boot
+        self.last = None # (on_time, pulse_count, ticks_ms, _frequency_changes when requested) of the previous answer
+        self.pending = False
+        self.requested_at = 0 # _frequency_changes when the pending request was made
+
+    def drain(self, handler):
+        # Calls handler(on_time, elapsed), in ms, with the time spent open since the last answer
+        if self.pending:
+            if not (self.sm_on_time.rx_fifo() and self.sm_pulse_count.rx_fifo()):
+                return # Still in a pulse, asked again on the next call
+            on_time = self.sm_on_time.get()
+            pulse_count = self.sm_pulse_count.get()
+            now = time.ticks_ms()
+            self.pending = False
+            if self.last is not None:
+                # Both totals count down
+                pulses = (self.last[1] - pulse_count) & 0xffffffff
+                self.pulses += pulses
+                if pulses and self.last[3] == _frequency_changes:
+                    elapsed = max(1, time.ticks_diff(now, self.last[2]))
+                    handler(((self.last[0] - on_time) & 0xffffffff) * _on_time_count_ms, elapsed)
+            self.last = (on_time, pulse_count, now, self.requested_at)
+        self.requested_at = _frequency_changes
+        self.sm_on_time.put(1)
+        self.sm_pulse_count.put(1)
+        self.pending = True
@@ -0,0 +1,140 @@
+import logging
+
+# Small functions run for every byte or sample, by the GPS reader and the
+# drivers. These are the reference versions, run as bytecode: at import,
+# they're replaced by the @micropython.native/viper ones of kernels_native
+# if the port can compile them.
+
+def frame(chunk, n, sentence, framing):
+    # Feeds chunk[framing[0]:n] to the NMEA sentence being framed, stopping as soon as one ends with a
+    # valid checksum: returns 1, sentence[:framing[1]] being its body, between $ and *. Returns 0 once
+    # the chunk is through. framing is array('i', [position, length, checksum, phase]), kept between chunks
+    i, length, calc, phase = framing[0], framing[1], framing[2], framing[3]
+    complete = 0
+    while i < n and not complete:
+        b = chunk[i]
+        i += 1
+        if b == 36: # $
+            length = 0
+            calc = 0
+            phase = 1
+        elif phase == 1:
+            if b == 42: # *
+                phase = 2
+            elif length < len(sentence):
+                sentence[length] = b
+                length += 1
+                calc ^= b
+            else:
+                phase = 0 # Too long
+        elif phase >= 2:
+            # Checksum digits: XORed into calc, which ends at 0 if they match
+            if 48 <= b <= 57:
+                digit = b - 48
+            elif 65 <= b <= 70:
+                digit = b - 55
+            else:
+                digit = -1
+            if digit < 0:
+                phase = 0
+            elif phase == 2:
+                calc ^= digit << 4
+                phase = 3
+            else:
+                phase = 0
+                complete = (calc ^ digit) == 0
+    framing[0] = i if complete else 0 # Resumes after the sentence, or from the start of the next chunk
+    framing[1], framing[2], framing[3] = length, calc, phase
+    return 1 if complete else 0
+
+def split(sentence, length, starts):
+    # Start of each comma separated field of sentence[:length] in starts, array('H'), plus length + 1
+    # after the last: field k is sentence[starts[k]:starts[k + 1] - 1]. Returns the number of fields
+    count = 1
+    starts[0] = 0
+    for i in range(length):
+        if sentence[i] == 44 and count < len(starts) - 1: # ,
+            starts[count] = i + 1
+            count += 1
+    starts[count] = length + 1
+    return count
+
+def decimal(buf, start, end, decimals):
+    # Integer from the number in buf[start:end], times 10**decimals: "-12.34", 1 -> -123
+    value = 0
+    negative = False
+    fraction = -1 # Digits kept after the point
+    for i in range(start, end):
+        b = buf[i]
+        if b == 45: # -
+            negative = True
+        elif b == 46: # .
+            fraction = 0
+        elif 48 <= b <= 57:
+            if fraction < 0:
+                value = value * 10 + b - 48
+            elif fraction < decimals:
+                value = value * 10 + b - 48
+                fraction += 1
+    fraction = max(fraction, 0)
+    while fraction < decimals:
+        value *= 10
+        fraction += 1
+    return -value if negative else value
+
+def coordinate(buf, start, end):
+    # Microdegrees from the NMEA ddmm.mmmmm (or dddmm.mmmmm) in buf[start:end]
+    point = start
+    while point < end and buf[point] != 46: # .
+        point += 1
+    minutes_start = max(point - 2, start)
+    degrees = decimal(buf, start, minutes_start, 0)
+    minutes = decimal(buf, minutes_start, end, 5) # 1e-5 minutes
+    return degrees * 1_000_000 + minutes // 6
+
+def bytes_toint(msb, lsb):
+    # Two bytes to a signed integer (big endian)
+    if not msb & 0x80:
+        return msb << 8 | lsb  # +ve
+    return - ((((msb ^ 255) << 8) | (lsb ^ 255)) + 1)
+
+def bcdtodec(bcd):
+    return ((bcd >> 4) * 10) + (bcd & 0x0F)
+
+def dectobcd(decimal):
+    return (decimal // 10) << 4 | (decimal % 10)
+
+def adc_code(response):
+    # 12 bits code from the MCP3208's 3 bytes response
+    adc_value = (response[0] & 0x01) << 11  # only B11 is here
+    adc_value |= response[1] << 3           # B10:B3
+    adc_value |= response[2] >> 5           # MSB has B2:B0 ... need to move down to LSB
+    return adc_value
+
+def put_glyph(buffer, index, glyphs, code):
+    # Segments of the character code at index, glyphs as in ht16k33_driver.GLYPHS. Codes and indexes
+    # out of the font or the buffer are ignored, as by Seg14x4.put()
+    c = code * 2 - 64
+    if c < 0 or c + 1 >= len(glyphs) or index < 0 or index * 2 + 1 >= len(buffer):
+        return
+    buffer[index * 2] = glyphs[1 + c]
+    buffer[index * 2 + 1] = glyphs[c]
+
+reference = {
+    'frame': frame,
+    'split': split,
+    'decimal': decimal,
+    'coordinate': coordinate,
+    'bytes_toint': bytes_toint,
+    'bcdtodec': bcdtodec,
+    'dectobcd': dectobcd,
+    'adc_code': adc_code,
+    'put_glyph': put_glyph,
+}
+
+try:
+    from kernels_native import frame, split, decimal, coordinate, bytes_toint, bcdtodec, dectobcd, adc_code, put_glyph
+    compiled = True
+except (ImportError, SyntaxError, ValueError) as e: # No emitter, or a .mpy of another architecture
+    compiled = False
+    logging.warn(f"> Kernels run as bytecode: {e}")
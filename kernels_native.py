@@ -0,0 +1,158 @@
+# Machine code versions of the kernels in kernels.py, which imports them
+# when the port has the native emitters (the RP2040's does). Same
+# arguments and results as the reference versions.
+import micropython
+
+
+@micropython.viper
+def frame(chunk, n: int, sentence, framing) -> int:
+    c = ptr8(chunk)
+    s = ptr8(sentence)
+    f = ptr32(framing)
+    size = int(len(sentence))
+    i = f[0]
+    length = f[1]
+    calc = f[2]
+    phase = f[3]
+    complete = 0
+    while i < n and complete == 0:
+        b = c[i]
+        i += 1
+        if b == 36:
+            length = 0
+            calc = 0
+            phase = 1
+        elif phase == 1:
+            if b == 42:
+                phase = 2
+            elif length < size:
+                s[length] = b
+                length += 1
+                calc ^= b
+            else:
+                phase = 0
+        elif phase >= 2:
+            digit = -1
+            if b >= 48 and b <= 57:
+                digit = b - 48
+            elif b >= 65 and b <= 70:
+                digit = b - 55
+            if digit < 0:
+                phase = 0
+            elif phase == 2:
+                calc ^= digit << 4
+                phase = 3
+            else:
+                phase = 0
+                if (calc ^ digit) == 0:
+                    complete = 1
+    if complete == 0:
+        i = 0
+    f[0] = i
+    f[1] = length
+    f[2] = calc
+    f[3] = phase
+    return complete
+
+@micropython.viper
+def split(sentence, length: int, starts) -> int:
+    s = ptr8(sentence)
+    f = ptr16(starts)
+    last = int(len(starts)) - 1
+    count = 1
+    f[0] = 0
+    i = 0
+    while i < length:
+        if s[i] == 44 and count < last:
+            f[count] = i + 1
+            count += 1
+        i += 1
+    f[count] = length + 1
+    return count
+
+@micropython.viper
+def decimal(buf, start: int, end: int, decimals: int) -> int:
+    p = ptr8(buf)
+    value = 0
+    negative = 0
+    fraction = -1
+    i = start
+    while i < end:
+        b = p[i]
+        if b == 45:
+            negative = 1
+        elif b == 46:
+            fraction = 0
+        elif b >= 48 and b <= 57:
+            if fraction < 0:
+                value = value * 10 + b - 48
+            elif fraction < decimals:
+                value = value * 10 + b - 48
+                fraction += 1
+        i += 1
+    if fraction < 0:
+        fraction = 0
+    while fraction < decimals:
+        value *= 10
+        fraction += 1
+    if negative:
+        value = 0 - value
+    return value
+
+@micropython.viper
+def coordinate(buf, start: int, end: int) -> int:
+    p = ptr8(buf)
+    point = start
+    while point < end and p[point] != 46:
+        point += 1
+    minutes_start = point - 2
+    if minutes_start < start:
+        minutes_start = start
+    degrees = 0
+    i = start
+    while i < minutes_start:
+        degrees = degrees * 10 + p[i] - 48
+        i += 1
+    minutes = 0
+    while i < point:
+        minutes = minutes * 10 + p[i] - 48
+        i += 1
+    digits = 0
+    i = point + 1
+    while i < end and digits < 5:
+        minutes = minutes * 10 + p[i] - 48
+        i += 1
+        digits += 1
+    while digits < 5:
+        minutes *= 10
+        digits += 1
+    return degrees * 1000000 + minutes // 6
+
+@micropython.viper
+def bytes_toint(msb: int, lsb: int) -> int:
+    if not msb & 0x80:
+        return (msb << 8) | lsb
+    return 0 - ((((msb ^ 255) << 8) | (lsb ^ 255)) + 1)
+
+@micropython.viper
+def bcdtodec(bcd: int) -> int:
+    return ((bcd >> 4) * 10) + (bcd & 0x0F)
+
+@micropython.native
+def dectobcd(decimal):
+    return (decimal // 10) << 4 | (decimal % 10)
+
+@micropython.viper
+def adc_code(response) -> int:
+    p = ptr8(response)
+    return ((p[0] & 0x01) << 11) | (p[1] << 3) | (p[2] >> 5)
+
+@micropython.viper
+def put_glyph(buffer, index: int, glyphs, code: int):
+    c = code * 2 - 64
+    if c < 0 or c + 1 >= int(len(glyphs)) or index < 0 or index * 2 + 1 >= int(len(buffer)):
+        return
+    b = ptr8(buffer)
+    g = ptr8(glyphs)
+    b[index * 2] = g[1 + c]
+    b[index * 2 + 1] = g[c]
@@ -1,5 +1,6 @@
 import machine
 import time
+from kernels import adc_code
 
 class MCP3208:
     def __init__(self, spi, cs):
@@ -16,13 +17,13 @@ class MCP3208:
         self.cs.value(0) 
         self._spi.write_readinto(config_bits, response)
         self.cs.value(1)
-        adc_value = (response[0] & 0x01) << 11  # only B11 is here
-        adc_value |= response[1] << 3           # B10:B3
-        adc_value |= response[2] >> 5           # MSB has B2:B0 ... need to move down to LSB
-        return adc_value
+        return adc_code(response)
     
     def read_voltage(self,pin):
         adc_value = self.read_value(pin)
         voltage_value = 5.2 * adc_value / 4096
         return voltage_value
-        
\ No newline at end of file
+        
+    def read_millivolts(self, pin):
+        # Integer, nothing allocated
+        return self.read_value(pin) * 5200 // 4096
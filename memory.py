@@ -1,21 +1,291 @@
 import ujson as json
+import os
+import struct
 import logging
+from machine import Timer
+try:
+    from binascii import crc32
+except ImportError:
+    def crc32(data, crc = 0):
+        crc ^= 0xffffffff
+        for byte in data:
+            crc ^= byte
+            for _ in range(8):
+                crc = (crc >> 1) ^ (0xedb88320 & -(crc & 1))
+        return crc ^ 0xffffffff
+
+settings_file = 'data.json'
+binary_settings_file = 'data.bin'
+previous_settings_file = 'data.bin.old' # Last good snapshot, kept by compact_settings()
+journal_file = 'data.jnl'
+
+# When enabled, the snapshot is a struct-packed record instead of JSON:
+# header (magic, schema version, payload size, CRC32 of the payload)
+# followed by the settings in schema order. Strings are stored as their
+# index in the enumeration. The previous record is kept aside and used if
+# the current one fails its checks. data.json is the migration source, and
+# is only used again if no record was ever written or a value doesn't fit.
+binary_snapshot = True
+
+_MAGIC = b'OBCS'
+_HEADER = '<4sBBI'
+_HEADER_SIZE = struct.calcsize(_HEADER)
+
+_ENUMS = {
+    'unit': ('METRIC', 'IMPERI.', 'UK'),
+    'sensors': ('V', 'V+OIL', 'CUST.1'),
+    'outdoor_sensor': ('FITTED', 'NONE'),
+    'wiring': ('CLOCK', 'OBC6', 'OBC13', 'TRANS.'),
+    'language': ('EN', 'FR', 'DE'),
+}
+
+# schema version: ((setting, struct format), ...)
+# Add a new version instead of editing an existing one: older records are
+# still decoded with their own schema and rewritten in the latest one.
+_SCHEMAS = {
+    1: (('odometer', 'f'), ('unit', 'B'), ('auto_off_delay', 'B'), ('sensors', 'B'),
+        ('outdoor_sensor', 'B'), ('inj_cal', 'H'), ('cyl_nb', 'B'), ('tank', 'B'),
+        ('clock_format', 'B'), ('wiring', 'B'), ('inj_cc', 'H'), ('display_brightness', 'B'),
+        ('language', 'B'), ('g_error', '2b')),
+    # The odometer as a float32 lost precision at every save, from 10^5 km
+    2: (('odometer', 'd'), ('unit', 'B'), ('auto_off_delay', 'B'), ('sensors', 'B'),
+        ('outdoor_sensor', 'B'), ('inj_cal', 'H'), ('cyl_nb', 'B'), ('tank', 'B'),
+        ('clock_format', 'B'), ('wiring', 'B'), ('inj_cc', 'H'), ('display_brightness', 'B'),
+        ('language', 'B'), ('g_error', '2b')),
+}
+_SCHEMA_VERSION = 2
+
+# Integer formats and their range: MicroPython's struct.pack truncates a
+# value out of range instead of raising, so they are checked before packing
+_RANGES = {'B': (0, 0xff), 'H': (0, 0xffff), '2b': (-0x80, 0x7f)}
+
+# Settings are loaded once into RAM and every read is served from there.
+# A write only updates the RAM copy and marks the key dirty; the dirty keys
+# are written by a debounced timer once the writes settle (digit presses
+# come in bursts), or immediately by flush_settings() before powering off.
+_flush_delay = 3000 # ms
+
+# Changes are appended to a journal, one small ["key", value] line per
+# write, instead of rewriting the whole file. Once the journal exceeds
+# _journal_compact_at bytes (one flash block), it is folded into a new
+# data.bin snapshot written aside and renamed over the old one (data.json
+# when binary_snapshot is off, or a value doesn't fit the record).
+# Replaying a journal on top of a snapshot is idempotent, so a power cut
+# at any point leaves either the old or the new state, and a record torn
+# mid-write is simply dropped.
+_journal_compact_at = 4 * 1024
+
+_settings = None
+_dirty = set()
+_journal_size = 0
+_transaction_depth = 0
+_subscribers = {}
+_flush_timer = Timer()
+
+def _file_size(file):
+    try:
+        return os.stat(file)[6]
+    except OSError:
+        return 0
+
+def _replay_journal():
+    # Returns False if the journal ends with a torn record
+    try:
+        with open(journal_file, 'r') as file:
+            for line in file:
+                try:
+                    setting_type, value = json.loads(line)
+                except (ValueError, TypeError):
+                    return False
+                _settings[setting_type] = value
+    except OSError:
+        pass
+    return True
+
+def _payload_format(schema):
+    return '<' + ''.join(fmt for setting_type, fmt in schema)
+
+def _pack_settings():
+    values = []
+    for setting_type, fmt in _SCHEMAS[_SCHEMA_VERSION]:
+        value = _settings[setting_type]
+        if setting_type in _ENUMS:
+            value = _ENUMS[setting_type].index(value)
+        if fmt in _RANGES:
+            items = value if fmt == '2b' else (value,)
+            low, high = _RANGES[fmt]
+            if fmt == '2b' and len(items) != 2:
+                raise ValueError(f"{setting_type} {value} isn't a pair")
+            for item in items:
+                if not isinstance(item, int) or not low <= item <= high:
+                    raise ValueError(f"{setting_type} {value} doesn't fit '{fmt}'")
+        if fmt == '2b':
+            values.extend(value)
+        else:
+            values.append(value)
+    payload = struct.pack(_payload_format(_SCHEMAS[_SCHEMA_VERSION]), *values)
+    header = struct.pack(_HEADER, _MAGIC, _SCHEMA_VERSION, len(payload), crc32(payload))
+    return header + payload
+
+def _unpack_settings(record):
+    magic, version, size, crc = struct.unpack_from(_HEADER, record)
+    payload = memoryview(record)[_HEADER_SIZE:_HEADER_SIZE + size]
+    if magic != _MAGIC or version not in _SCHEMAS or len(payload) != size or crc32(payload) != crc:
+        raise ValueError(f"bad record (version {version})")
+    values = struct.unpack(_payload_format(_SCHEMAS[version]), payload)
+    settings = {}
+    index = 0
+    for setting_type, fmt in _SCHEMAS[version]:
+        if fmt == '2b':
+            settings[setting_type] = [values[index], values[index + 1]]
+            index += 2
+            continue
+        value = values[index]
+        if setting_type in _ENUMS:
+            value = _ENUMS[setting_type][value]
+        settings[setting_type] = value
+        index += 1
+    return version, settings
+
+def _load_binary_snapshot(file_name):
+    # Returns None if there is no usable record in file_name
+    try:
+        with open(file_name, 'rb') as file:
+            record = file.read()
+    except OSError:
+        return None
+    try:
+        version, settings = _unpack_settings(record)
+    except (ValueError, IndexError) as e:
+        logging.error(f"> {file_name} is corrupted ({e})")
+        os.rename(file_name, file_name + '.bad')
+        return None
+    if version != _SCHEMA_VERSION:
+        logging.info(f"> Migrating settings from schema {version} to {_SCHEMA_VERSION}")
+        _dirty.update(settings)
+    return settings
+
+def load_settings():
+    global _settings, _journal_size
+    _dirty.clear()
+    _settings = None
+    if binary_snapshot:
+        _settings = _load_binary_snapshot(binary_settings_file)
+        if _settings is None:
+            _settings = _load_binary_snapshot(previous_settings_file)
+            if _settings is not None:
+                logging.warn(f"> Using the previous settings, {previous_settings_file}")
+                _dirty.update(_settings) # Written again as the current record
+    if _settings is None:
+        try:
+            with open(settings_file, 'r') as file:
+                _settings = json.load(file)
+        except (OSError, ValueError):
+            logging.error(f"> Could not load {settings_file}")
+            _settings = {}
+        if binary_snapshot and _settings:
+            logging.info(f"> Migrating {settings_file} to {binary_settings_file}")
+            _dirty.update(_settings)
+    _journal_size = _file_size(journal_file)
+    if not _replay_journal():
+        logging.warn(f"> Torn record in {journal_file}, compacting")
+        compact_settings()
+    elif _dirty:
+        compact_settings()
+
+def compact_settings():
+    global _journal_size
+    record = None
+    if binary_snapshot:
+        try:
+            record = _pack_settings()
+        except (KeyError, ValueError, TypeError, OverflowError) as e:
+            logging.warn(f"> Settings don't fit {binary_settings_file} ({e}), using {settings_file}")
+    if record is not None:
+        with open(binary_settings_file + '.tmp', 'wb') as file:
+            file.write(record)
+        try: # The current record becomes the previous one
+            os.rename(binary_settings_file, previous_settings_file)
+        except OSError:
+            pass
+        os.rename(binary_settings_file + '.tmp', binary_settings_file)
+    else:
+        with open(settings_file + '.tmp', 'w') as file:
+            json.dump(_settings, file)
+        os.rename(settings_file + '.tmp', settings_file)
+        try:
+            os.remove(binary_settings_file)
+        except OSError:
+            pass
+    try:
+        os.remove(journal_file)
+    except OSError:
+        pass
+    _dirty.clear()
+    _journal_size = 0
+
+def flush_settings(timer = None):
+    global _journal_size
+    if not _dirty or _transaction_depth: # A transaction is saved as a whole, when it ends
+        return
+    _flush_timer.deinit()
+    logging.debug(f"> Saving settings {_dirty}")
+    with open(journal_file, 'a') as file:
+        for setting_type in _dirty:
+            record = json.dumps([setting_type, _settings[setting_type]]) + '\n'
+            file.write(record)
+            _journal_size += len(record)
+    _dirty.clear()
+    if _journal_size > _journal_compact_at:
+        compact_settings()
 
 def access_setting(setting_type, data_to_write = None):
+    if _settings is None:
+        load_settings()
     try:
-        with open('data.json', 'r') as file:
-            data = json.load(file)
-            result = data[setting_type]
-            file.close()
-    except:
+        result = _settings[setting_type]
+    except KeyError:
         logging.error(f"> Setting {setting_type} not found")
         return False
 
-    if not data_to_write:
+    if data_to_write is None:
         return result
     else:
-        with open('data.json', 'w') as file:
-            data[setting_type] = data_to_write
-            json.dump(data, file)
-            file.close()
-        
+        _settings[setting_type] = data_to_write
+        _dirty.add(setting_type)
+        if not _transaction_depth:
+            _flush_timer.init(mode = Timer.ONE_SHOT, period = _flush_delay, callback = flush_settings)
+        for callback in _subscribers.get(setting_type, ()):
+            callback(setting_type, data_to_write)
+
+def subscribe(setting_types, callback):
+    # callback(setting_type, value) is called after each write to one of
+    # the settings, so components can keep their own copy up to date
+    for setting_type in setting_types:
+        _subscribers.setdefault(setting_type, []).append(callback)
+
+def access_settings(settings):
+    # Reads a list of settings (returns their values in the same order),
+    # or writes a {setting: value} dict as a single transaction
+    if isinstance(settings, dict):
+        with Transaction():
+            for setting_type in settings:
+                access_setting(setting_type, settings[setting_type])
+    else:
+        return [access_setting(setting_type) for setting_type in settings]
+
+
+class Transaction:
+    # with Transaction(): groups writes, they are saved together in one
+    # journal append when the outermost block exits
+    def __enter__(self):
+        global _transaction_depth
+        _transaction_depth += 1
+        _flush_timer.deinit() # Armed by an earlier write, it would save part of the transaction
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        global _transaction_depth
+        _transaction_depth -= 1
+        if not _transaction_depth:
+            flush_settings()
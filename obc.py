@@ -0,0 +1,1662 @@
+# -----------------------------------------------------------------------------
+# 80s Engineering On-board Computer Firmware v5 - 01/10/2025
+# Copyright (C) 2025 80s Engineering. All rights reserved.
+#
+# This firmware is proprietary. Users are permitted to modify it; however,
+# redistribution, selling, or unauthorized commercial use is not authorized.
+#
+# For inquiries, support, or permission requests, please contact us at:
+# contact@80s.engineering
+#
+# THE FIRMWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE FIRMWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+# -----------------------------------------------------------------------------
+import time                          #
+import profiler                      # Per stage timings, enabled with DEBUG logging
+import ht16k33_driver                # Display's driver
+from GPS_parser import GPS_handler   #
+from button import Button            #
+from imu import MPU6050              # Accelerometer
+from mcp3208 import MCP3208          # Analog to digital converter
+from dictionnary import Dictionnary  # Used for translations
+from unit import Unit                # Handles metric to imperial conversions
+from temperature import Temperature  # Handles temperature measurements
+from machine import UART, I2C, Pin, RTC, SPI, ADC, Timer, lightsleep
+from timer import Timer_, LapTimer   #
+from checkpoint import TripCheckpoint # Saves the ongoing trip against brownouts and resets
+from scheduler import Scheduler      # Runs the loop's stages as uasyncio tasks
+from acquisition import Acquisition, Samples, SampledADC # Sensor sampling on the second core
+from watchdog import Supervisor      # Resets the OBC if a stage stops running on time
+import ujson as json                 #
+from memory import access_setting, access_settings, Transaction, subscribe #
+import os                            #
+import logging                       #
+from ds3231 import DS3231            # Real time clock
+import gc_policy                     # Decides when the garbage collector frees up unused memory
+import governor                      # Sets the CPU frequency for what is displayed
+import injector_pulse_analyzer       #
+from rp2 import StateMachine         # StateMachine allow for PIO support, used in fuel consumption
+                                     # for precise timing of injector pulses
+# fota_master and FOTA (networking, HTTP server, OTA) are only imported by sw_update, when needed
+profiler.mark('imports')
+
+def tenths(value):
+    # "12.6" from 126: the sensors read in integers, shown as decimals
+    return "{}.{}".format(value // 10, value % 10)
+
+class OBC:
+    def __init__(self):
+        self.pwr_pin = Pin(0, Pin.OUT) # Used to latch power on/off
+        self.pwr_pin.high()
+        self.accy = Pin(28, Pin.IN, Pin.PULL_DOWN)
+        self.power_on_trigger = 'Ignition'
+        self.powered = False
+        self.power_requested = False # By an IRQ, see request_power()
+        self.power_trigger = None
+        self.supervisor = Supervisor() # Started by loop()
+        self.load_cached_settings()
+        self.accy.irq(handler = self.get_ignition_status, trigger =  Pin.IRQ_RISING | Pin.IRQ_FALLING)
+        self.led = Pin("LED", Pin.OUT) #RPi's internal LED
+        self.led.high()
+        profiler.mark('settings')
+        self.init_communication() # Initiates I2C and SPI communication to RTC, display, MPU and ADC
+        profiler.mark('communication')
+
+        if not self.get_ignition_status():
+            self.power_on_trigger = 'SET_press'
+            self.display.fill()
+            self.display.show()
+            while Pin(12, Pin.IN, Pin.PULL_DOWN).value(): #Prevents unwanted SET press when powering-on
+                pass
+        
+        self.powered = True
+        profiler.mark('power on')
+
+        self.display.brightness(self.display_brightness)
+        #self.buttonX = Button(pin_number, button_id, function)
+        self.button1 = Button(4, 1, self.function_manager)
+        self.button2 = Button(5, 2, self.function_manager)
+        self.button3 = Button(6, 3, self.function_manager)
+        self.button4 = Button(7, 4, self.function_manager)
+        self.button5 = Button(8, 5, self.function_manager)
+        self.button6 = Button(9, 6, self.function_manager)
+        self.button7 = Button(10, 7, self.function_manager)
+        self.button8 = Button(11, 8, self.function_manager)
+        self.button9 = Button(12, 9, self.set_reset)
+        self.button10 = Button(13, 10, self.digit_manager)
+        self.button11 = Button(14, 11, self.digit_manager)
+        self.button12 = Button(15, 12, self.digit_manager)
+        self.button13 = Button(20, 13, self.digit_manager)
+        self.stalk_button = Button(21, 14, self.stalk_handler)
+        profiler.mark('buttons')
+
+        self.digit_pressed = 0
+
+
+        # The adjusters are used to lower the refresh rate of certain displayed values,
+        # by averaging temporary data. 
+        self.averaging_adjuster = {'samples':0,'sum':0,'last_value':None}
+
+        # The OBC has a dedicated always running DS3231 RTC,
+        # which is used to set the RPi's internal RTC
+        self.rpi_rtc = RTC()
+        try:
+            self.rpi_rtc.datetime(self.rtc.datetime())
+        except OSError:
+            self.rtc = RTC()
+
+        self.timer = Timer_()
+        self.laptimer = LapTimer()
+        self.acceleration_timer = Timer_()
+        self.speed_limit = 0
+        self.speed_limit_is_active = False
+        # The ADC is sampled by the acquisition engine, core 0 only reads its published samples
+        self.samples = Samples()
+        self.sampled_adc = SampledADC(self.samples)
+        self.oil_temp_sensor = Temperature("oil",self.sampled_adc)
+        self.out_temp_sensor = Temperature("out",self.sampled_adc)
+        self.water_temp_sensor = Temperature("water",self.sampled_adc)
+        self.exhaust_temp_sensor = Temperature("exhaust",self.sampled_adc)
+        self.sensor_getting_set = None
+        self.unit = Unit(access_setting("unit"))
+        profiler.mark('rtc and sensors')
+
+        self.cabin_light = Pin(22, Pin.IN, Pin.PULL_DOWN)
+        self.cabin_light.irq(handler = self.cabin_light_handler, trigger = Pin.IRQ_RISING | Pin.IRQ_FALLING)
+        
+        #Fuel related inits
+        self.injector_pulse = Pin(27, Pin.IN, Pin.PULL_DOWN)
+        self.sm0 = StateMachine(0, injector_pulse_analyzer.pulse_width, in_base=self.injector_pulse, jmp_pin=self.injector_pulse)
+        self.sm1 = StateMachine(1, injector_pulse_analyzer.period, in_base=self.injector_pulse, jmp_pin=self.injector_pulse)
+        self.sm0.active(1)
+        self.sm1.active(1)
+        try:
+            # Cumulative counters on PIO1, PIO0's instruction memory is taken by the programs above
+            self.sm4 = StateMachine(4, injector_pulse_analyzer.on_time, jmp_pin=self.injector_pulse)
+            self.sm5 = StateMachine(5, injector_pulse_analyzer.pulse_count, jmp_pin=self.injector_pulse)
+            self.injector_counter = injector_pulse_analyzer.InjectorCounter(self.sm4, self.sm5)
+            self.sm4.active(1)
+            self.sm5.active(1)
+        except (OSError, ValueError) as e:
+            logging.error(f"> Could not start the injector counters ({e}), sampling pulses instead")
+            self.injector_counter = injector_pulse_analyzer.PulseSampler(self.sm0, self.sm1)
+        self.consumed_fuel = 0
+        self.acquisition = Acquisition(self.adc, self.acquire)
+        self.acquisition_threaded = False # Set by loop()
+        self.idle_sleep = 2000 # ms, longest light sleep while powered off
+        profiler.mark('fuel')
+
+        # Restores the trip and fuel consumption if the last session ended without saving them
+        self.trip_checkpoint = TripCheckpoint()
+        checkpoint = self.trip_checkpoint.restore()
+        if checkpoint:
+            odometer, trip, consumed_fuel = checkpoint
+            if abs(odometer - self.stored_odometer) < 0.1:
+                self.gps.trip = trip
+                self.consumed_fuel = consumed_fuel
+        profiler.mark('checkpoint')
+        
+        self.setting_index = 0 # Used in the setting menu, accessed by simultaneously pressing 1000 and 10.
+
+        self.displayed_function = self.hour # self.displayed_function is what the infinite loop is contineously running
+        self.build_navigation()
+        self.last_displayed_function = None
+        self.overheat_temperature = None
+        self.can_switch_function = True
+        
+        self.auto_off_timer = Timer()
+        self.auto_off_timer.init(mode = Timer.ONE_SHOT,
+                                 period = self.auto_off_delay,
+                                 callback = self.auto_off_handler)
+
+        self.loop()
+
+# -------------------------SYSTEM RELATED FUNCTIONS----------------------------
+
+    # The GPS receiver is configured (see gps_config) if its RX line is wired to gps_tx. None on the current
+    # boards: UART0's TX is GP0, which latches the power, so it runs at its defaults and the reader drops
+    # all but RMC and GGA
+    gps_tx = None
+    gps_protocol = 'PMTK' # Or 'UBX'
+    gps_rate = 10 # Fixes per second
+
+    def init_buses(self):
+        # The UART, I2C and SPI objects of a given id are shared, so initializing them again re-applies
+        # their baud rates, derived from the system clock, without touching the drivers using them
+        tx = None if self.gps_tx is None else Pin(self.gps_tx)
+        self.uart = UART(0, baudrate=115200 , rx=Pin(1), tx=tx, stop = 1, parity = None, bits = 8 )
+        self.i2c = I2C(id=1, sda=Pin(2), scl=Pin(3), freq = 115200)
+        self.spi = SPI(0, sck=Pin(18),mosi=Pin(19),miso=Pin(16), baudrate=50000)
+
+    def init_communication(self):
+        self.init_buses()
+        if self.gps_tx is not None:
+            import gps_config
+            gps_config.configure(self.uart, self.gps_protocol, self.gps_rate)
+        self.gps = GPS_handler(self.uart)
+        self.rtc = DS3231(self.i2c)
+        self.display = ht16k33_driver.Seg14x4(self.i2c)
+        self.display.clear()
+        self.display.show()
+        self.mpu = MPU6050(self.i2c,device_addr = 1)
+        spi_cs = Pin(17, Pin.OUT)
+        self.adc = MCP3208(self.spi, spi_cs)
+
+    def frequency_changed(self, frequency): # Run by the governor, acquisition lock held
+        if self.powered: # Otherwise power_handler() initializes them when powering on
+            self.init_buses()
+        injector_pulse_analyzer.update_frequency()
+
+    # Clock level per displayed function, the others run at 'normal'
+    governed_functions = {'lap_timer': 'boost', 'acceleration': 'boost',
+                          'hour': 'static', 'date': 'static', 'odometer': 'static', 'set_setting': 'static'}
+
+    def govern(self):
+        if not self.powered:
+            governor.set_level('idle')
+        else:
+            governor.set_level(self.governed_functions.get(self.displayed_function.__name__, 'normal'))
+
+
+    def request_power(self, trigger = None):
+        # Run from the IRQs: power_handler() parks the second core and takes the acquisition lock, which the
+        # interrupted code may hold (the governor does), so the 'power' stage runs it instead
+        self.power_trigger = trigger
+        self.power_requested = True
+
+    def power_stage(self):
+        if self.power_requested:
+            self.power_requested = False
+            self.power_handler(self.power_trigger)
+
+    def power_handler(self,trigger = None):
+        self.powered = not self.powered
+        if self.powered:
+            logging.debug("> System powered on")
+            self.pwr_pin.high()
+            self.init_communication()
+            try: # The RPi's RTC may have drifted while sleeping
+                self.rpi_rtc.datetime(self.rtc.datetime())
+            except OSError:
+                pass
+            self.acquisition.attach(self.adc)
+            if self.acquisition_threaded: # Otherwise it is a stage of the scheduler
+                self.acquisition.start()
+            self.led.high()
+        else:
+            self.supervisor.hold() # Waits on the driver
+            try:
+                while self.cabin_light_handler() and not self.button9.pin.value() and not self.get_ignition_status():
+                    self.display.put_text(self.words['LIGHTS'])
+                    self.display.show()
+                    self.display.blink_rate(1)
+                    time.sleep_ms(50)
+            finally:
+                self.supervisor.release()
+            if not self.get_ignition_status() or trigger == "SET_press":
+                logging.debug("> System powered off")
+                if not self.acquisition.stop(): # Parks the second core, see idle()
+                    logging.warn("> Acquisition did not stop, powering off under its lock")
+                with self.acquisition.lock:
+                    self.uart.deinit()
+                    with Transaction(): # Saved right away, the power is about to be cut
+                        self.gps.save_odometer()
+                    self.consumed_fuel = 0 # Goes with the trip, now added to the odometer
+                self.trip_checkpoint.save(self.stored_odometer, 0, 0)
+                self.pwr_pin = Pin(0, Pin.OUT)
+                self.display.clear()
+                self.display.blink_rate(0)
+                self.display.show()
+                time.sleep_ms(50)
+                self.pwr_pin.low()
+                self.led.low()
+            else:
+                self.display.blink_rate(0)
+                self.powered = True
+
+    def reset_trip(self):
+        with self.acquisition.lock:
+            self.gps.save_odometer()
+            self.consumed_fuel = 0
+        self.trip_checkpoint.save(self.stored_odometer, 0, 0)
+
+    # Settings the OBC keeps a copy of, as {setting: attribute}. The copies are
+    # kept up to date by setting_changed() so nothing has to read them back.
+    cached_settings = {'wiring': 'wiring', 'display_brightness': 'display_brightness', 'clock_format': 'clock_format',
+                       'language': 'language', 'inj_cc': 'injector_cc', 'cyl_nb': 'cyl_nb', 'inj_cal': 'inj_cal',
+                       'auto_off_delay': 'auto_off_delay', 'sensors': 'sensors', 'outdoor_sensor': 'outdoor_sensor',
+                       'g_error': 'g_error', 'odometer': 'stored_odometer'}
+
+    def load_cached_settings(self):
+        setting_types = tuple(self.cached_settings)
+        for setting_type, value in zip(setting_types, access_settings(setting_types)):
+            setattr(self, self.cached_settings[setting_type], value)
+        self.auto_off_delay = self.auto_off_delay * 60 * 60 * 1000
+        self.words = Dictionnary(self.language).words
+        self.update_fuel_flow()
+        subscribe(setting_types, self.setting_changed)
+
+    def setting_changed(self, setting_type, value):
+        setattr(self, self.cached_settings[setting_type], value)
+        if setting_type == 'auto_off_delay':
+            self.auto_off_delay = value * 60 * 60 * 1000
+        elif setting_type == 'language':
+            self.words = Dictionnary(value).words
+        elif setting_type == 'display_brightness':
+            if self.powered:
+                self.cabin_light_handler()
+        elif setting_type in ('inj_cc', 'cyl_nb', 'inj_cal'):
+            self.update_fuel_flow()
+        elif setting_type in ('wiring', 'sensors', 'outdoor_sensor'):
+            self.build_navigation()
+
+    def update_fuel_flow(self):
+        # cc per second of injector opening, all cylinders included
+        self.fuel_flow = (self.injector_cc / 60) * (self.inj_cal / 100) * self.cyl_nb
+
+    def restart_auto_off_timer(self):
+        self.auto_off_timer.deinit()
+        self.auto_off_timer.init(mode = Timer.ONE_SHOT,
+                                 period = self.auto_off_delay,
+                                 callback = self.auto_off_handler)
+        
+    def auto_off_handler(self, timer = None):
+        logging.debug(f"> No activity for {self.auto_off_delay}ms")
+        self.request_power()
+
+    def cabin_light_handler(self, pin = None):
+        display_brightness = self.display_brightness
+        if self.cabin_light.value():
+            if display_brightness > 5:
+                self.display.brightness(display_brightness - 5)
+            else:
+                self.display.brightness(0)
+            return True
+        else:
+            self.display.brightness(display_brightness)
+            return False
+
+
+    def get_ignition_status(self, pin = None):
+        value = self.accy.value()
+        if self.powered and self.wiring in ['OBC6','OBC13', 'TRANS.'] and self.power_on_trigger == 'Ignition':
+                    if not value:
+                        self.request_power()
+        elif not self.powered and value and self.wiring in ['OBC6','OBC13', 'TRANS.'] and pin is not None:
+            self.power_on_trigger = 'Ignition'
+            self.request_power() # Wakes up the OBC from idle()
+        return value
+
+
+
+    def available_function_manager(self, functions_list): # Only enables functions availabe with the present car's wiring and sensors
+        def remove_function(function):
+            try:
+                functions_list.remove(function)
+            except ValueError:
+                pass
+                
+        if self.sensors == 'V':
+            remove_function(self.pressure)
+            remove_function(self.oil_temperature)
+        if self.water_temperature in functions_list and self.sensors != 'CUST.1':
+            remove_function(self.water_temperature)
+            remove_function(self.exhaust_temperature)
+        if self.out_temperature in functions_list:
+            if self.outdoor_sensor == "NONE":
+                remove_function(self.out_temperature)
+        if self.wiring not in ['OBC13', 'TRANS.']:
+            fuel_related_functions = [self.fuel_range, self.mpg]
+            for function in fuel_related_functions:
+                if function in functions_list:
+                    remove_function(function)
+        return functions_list
+
+    def build_navigation(self):
+        # self.navigation[button_id] maps a displayed function's name to the (next, previous) functions a
+        # short or a long press switches to, None to the ones used from any other function.
+        # Built once, and again when the wiring or the sensors change, so a press is a single lookup.
+        def ring(functions): # Functions left out by the wiring or the sensors are skipped, wherever the stalk is
+            available = self.available_function_manager(list(functions))
+            table = {}
+            for index, function in enumerate(functions):
+                following = functions[index+1:] + functions[:index]
+                next_function = [f for f in following if f in available][0]
+                previous_function = [f for f in reversed(following) if f in available][0]
+                table[function.__name__] = (next_function, previous_function)
+            return table
+
+        def cycle(functions, last): # Goes back to the first one from the last one, or from any other function
+            table = {None: (functions[0], functions[0]), last.__name__: (functions[0], functions[0])}
+            for index in range(len(functions) - 1):
+                table[functions[index].__name__] = (functions[index+1], functions[index-1] if index else last)
+            return table
+
+        fuel_wiring = self.wiring in ["OBC13", "TRANS."]
+        self.navigation = {
+            1: {None: (self.hour, self.hour), 'hour': (self.date, self.date)},
+            2: {None: (self.speed, self.speed)},
+            3: {None: (self.acceleration, self.acceleration)},
+            4: {None: (self.lap_timer, self.lap_timer)},
+            5: {None: (self.odometer, self.odometer)},
+            7: cycle(self.available_function_manager([self.pressure, self.oil_temperature, self.water_temperature,
+                                                      self.exhaust_temperature, self.voltage]), self.voltage),
+            8: cycle(self.available_function_manager([self.out_temperature, self.heading, self.altitude,
+                                                      self.g_sensor]), self.g_sensor),
+            14: ring([self.hour, self.date, self.speed, self.acceleration, self.lap_timer,
+                      self.mpg, self.fuel_range, self.odometer, self.timer_function, self.pressure,
+                      self.oil_temperature, self.water_temperature, self.exhaust_temperature, self.voltage,
+                      self.out_temperature, self.altitude, self.heading, self.g_sensor]),
+        }
+        if self.wiring == "TRANS.":
+            self.navigation[3]['acceleration'] = (self.lap_timer, self.lap_timer)
+            self.navigation[4] = {None: (self.set_transmission, self.set_transmission)}
+        if fuel_wiring:
+            self.navigation[5] = {None: (self.mpg, self.mpg), 'mpg': (self.fuel_range, self.odometer),
+                                  'fuel_range': (self.odometer, self.odometer)}
+
+    def navigate(self, button_id, long_press):
+        navigation = self.navigation[button_id]
+        functions = navigation.get(self.displayed_function.__name__) or navigation.get(None)
+        if functions:
+            self.displayed_function = functions[1] if long_press else functions[0]
+
+    def stalk_handler(self, button_id, long_press):
+        self.restart_auto_off_timer()
+        self.digit_pressed = 0
+        if not self.powered: # Wakes up the OBC if stalk is pressed
+            self.request_power()
+            return
+        if self.can_switch_function:
+            self.navigate(button_id, long_press)
+
+
+    def function_manager(self, button_id, long_press):
+        self.restart_auto_off_timer()
+        self.digit_pressed = 0
+        if not self.powered: # Wakes up the OBC if function is switched
+            self.request_power()
+        if self.can_switch_function:
+            if button_id == 6:
+                if self.displayed_function == self.timer_function:
+                    self.timer.is_displayed = True
+                    if self.timer.lap_start != 0:
+                        if self.timer.is_running:
+                            self.timer.lap()
+                        else:
+                            self.timer.reset()
+                else:
+                    self.displayed_function = self.timer_function
+                    self.timer.is_displayed = False
+            else:
+                if button_id in (5, 7, 8):
+                    self.averaging_adjuster = {'samples': 0, 'sum': 0, 'last_value': None}
+                if button_id == 7:
+                    for sensor in [self.oil_temp_sensor, self.water_temp_sensor, self.exhaust_temp_sensor, self.out_temp_sensor]:
+                        sensor.refresh_rate_adjuster = {'samples': 0, 'sum': 0, 'last_value': None}
+                self.navigate(button_id, long_press)
+        else:
+            logging.debug("> Switching function not allowed")
+
+        logging.info(f"> Displayed function: {self.displayed_function.__name__}")
+
+
+    def digit_manager(self, button_id, long_press):
+        self.restart_auto_off_timer()
+        if self.displayed_function in (self.set_hour, self.set_date, self.set_year, self.set_limit, self.set_odometer_thousands,
+                                       self.set_odometer_hundreds, self.set_max_temperature, self.set_setting, self.set_language,
+                                       self.set_clock_format, self.set_unit,self.set_wiring,self.set_display_brightness,self.set_sensors,
+                                       self.set_auto_off,self.set_gsensor_error, self.set_logging, self.set_injector_cc, self.set_cyl_nb,
+                                       self.set_injector_calibration, self.set_outdoor_temp, self.set_tank_volume):
+            if not long_press:
+                digit_map = {10: 1000, 11: 100, 12: 10, 13:1}
+                self.digit_pressed = digit_map.get(button_id)
+            else: # Long presses decrements the digit by their corresponding values
+                digit_map = {10: -1000, 11: -100, 12: -10,13:-1}
+                self.digit_pressed = digit_map.get(button_id)
+        else:
+            # Setting menu accessed by simultaneously pressing 1000 + 10
+            if (button_id == 10 and not self.button12.pin.value()) or (button_id == 12 and not self.button10.pin.value()):
+                self.displayed_function = self.set_setting
+                self.display.fill() #To check for potential dead pixels
+                self.display.show()
+                self.supervisor.hold()
+                time.sleep_ms(2000)
+                self.supervisor.release()
+
+    def set_reset(self, button_id, long_press):
+        self.restart_auto_off_timer()
+        self.digit_pressed = 0
+        setting_functions = [self.set_language, self.set_clock_format, self.set_unit,
+                             self.sw_update, self.set_display_brightness, self.set_sensors,
+                             self.set_outdoor_temp, self.set_wiring, self.set_auto_off,
+                             self.set_gsensor_error, self.set_logging, self.set_injector_cc,
+                             self.set_cyl_nb, self.set_injector_calibration, self.set_tank_volume]
+
+        if not long_press:
+            if not self.powered:
+                self.request_power()
+
+            elif self.displayed_function == self.hour:
+                self.displayed_function = self.set_hour
+                self.display.blink_rate(1)
+                self.can_switch_function = False
+
+            elif self.displayed_function == self.set_hour:
+                self.displayed_function = self.hour
+                self.display.blink_rate(0)
+                self.can_switch_function = True
+
+            elif self.displayed_function == self.date:
+                self.displayed_function = self.set_year
+                self.display.blink_rate(1)
+                self.can_switch_function = False
+
+            elif self.displayed_function == self.set_year:
+                self.displayed_function = self.set_date
+
+            elif self.displayed_function == self.set_date:
+                self.displayed_function = self.date
+                self.display.blink_rate(0)
+                self.can_switch_function = True
+
+            elif self.displayed_function == self.timer_function:
+                if not self.timer.is_running:
+                    self.timer.start()
+                else:
+                    self.timer.stop()
+
+            elif self.displayed_function == self.lap_timer:
+                if self.laptimer.is_running:
+                    self.laptimer.end()
+                elif self.gps.parsed.fix_type:
+                    self.laptimer.reset_laptimer()
+                    self.laptimer.start()
+
+            elif self.displayed_function == self.acceleration:
+                if self.acceleration_timer.start_time is not None:
+                    self.acceleration_timer.reset()
+
+
+            elif self.displayed_function == self.speed:
+                self.displayed_function = self.set_limit
+                self.can_switch_function = False
+                self.display.blink_rate(1)
+
+
+            elif self.displayed_function == self.set_limit:
+                self.display.blink_rate(0)
+                self.displayed_function = self.speed
+                self.speed_limit_is_active = not self.speed_limit_is_active
+                self.can_switch_function = True
+
+            elif self.displayed_function == self.overspeed_alert:
+                self.speed_limit_is_active = False
+                self.display.blink_rate(0)
+                self.can_switch_function = True
+                self.displayed_function = self.last_displayed_function
+
+            elif self.displayed_function in [self.mpg, self.fuel_range]:
+                self.reset_trip()
+                
+            elif self.displayed_function == self.odometer:
+                self.reset_trip()
+                self.display.blink_rate(0)
+                self.displayed_function = self.set_odometer_thousands
+                self.can_switch_function = False
+
+            elif self.displayed_function == self.set_odometer_thousands:
+                self.display.blink_rate(0)
+                self.displayed_function = self.set_odometer_hundreds
+
+
+            elif self.displayed_function == self.set_odometer_hundreds:
+                self.display.blink_rate(0)
+                self.displayed_function = self.odometer
+                self.can_switch_function = True
+
+            elif self.displayed_function in [self.oil_temperature, self.water_temperature, self.exhaust_temperature]:
+                self.display.blink_rate(1)
+                corresponding_sensor = {"oil_temperature":self.oil_temp_sensor,"water_temperature":self.water_temp_sensor,
+                                        "exhaust_temperature":self.exhaust_temp_sensor}
+                self.sensor_getting_set = corresponding_sensor[self.displayed_function.__name__]
+                self.last_displayed_function = self.displayed_function
+                self.displayed_function = self.set_max_temperature
+                self.can_switch_function = False
+            
+            elif self.displayed_function == self.set_max_temperature:
+                self.display.blink_rate(0)
+                self.sensor_getting_set.limit_is_active = not self.sensor_getting_set.limit_is_active
+                self.can_switch_function = True
+                self.displayed_function = self.last_displayed_function
+
+            elif self.displayed_function == self.overheat_alert:
+                self.display.blink_rate(0)
+                self.sensor_getting_set.limit_is_active = False
+                self.can_switch_function = True
+                self.displayed_function = self.last_displayed_function
+                
+
+            elif self.displayed_function == self.set_setting:
+                try:
+                    self.displayed_function = setting_functions[self.setting_index]
+                except IndexError:
+                    pass
+
+            elif self.displayed_function == self.sw_update:
+                import fota_master
+                fota_master.machine_reset()
+
+            elif self.displayed_function in setting_functions:
+                self.displayed_function = self.set_setting
+
+            logging.info(f"> Displayed function: {self.displayed_function.__name__}")
+
+        else: # Power-off if set is long pressed
+            if self.can_switch_function:
+                self.request_power(trigger = 'SET_press')
+
+
+    def show(self, text):
+        if self.powered:
+            self.display.clear()
+            self.display.put_text(text)
+            self.display.show()
+
+    def show_function_name(self, button): # Shows function's name when corresponding button is pressed
+        now = time.ticks_ms()
+        if time.ticks_diff(now, button.current_press['release']) < 700 or time.ticks_diff(now, self.stalk_button.current_press['release']) < 700:
+            return True
+        else:
+            return False
+
+# ---------------------------OBC FUNCTIONS-----------------------------
+
+    def hour(self):
+        if self.show_function_name(self.button1):
+            self.show(self.words['HOUR'])
+        else:
+            current_time = self.rtc.datetime()
+            self.show_hour(current_time)
+
+    def set_hour(self):
+        current_time = self.rtc.datetime()
+        year, month, day, week_day, hour, minute, second, ms = current_time[0], current_time[1], current_time[2], \
+            current_time[3], current_time[4], current_time[5], 0, current_time[7]
+        digit_mapping = {
+            1000: (10, 0),
+            100: (1, 0),
+            10: (0, 10),
+            1: (0, 1),
+            -1: (0, -1),
+            -10: (0, -10),
+            -100: (-1, 0),
+            -1000: (-10, 0)
+        }
+
+        if self.digit_pressed in digit_mapping:
+            hour_change, minute_change = digit_mapping[self.digit_pressed]
+            hour += hour_change
+            minute += minute_change
+            hour = hour % 24
+            minute = minute % 60
+            current_time = (year, month, day, hour, minute, second, week_day)
+            self.rtc.datetime(current_time)
+            self.digit_pressed = 0
+        self.show_hour(self.rtc.datetime())
+
+    def show_hour(self, time_to_show):
+        minute = "{:02d}".format(time_to_show[5])
+        second = time_to_show[6]
+        if self.clock_format == 24:
+            hour = "{:02d}".format(time_to_show[4])
+            if second % 2 == 0:  # Makes the dot blink
+                self.show(' ' + hour + '.' + minute)
+            else:
+                self.show(' ' + hour + minute)
+        else:
+            hour = time_to_show[4]
+            hour_suffix = 'AM' if hour < 12 else 'PM'
+            hour = "{:02d}".format(hour % 12)
+            if hour == "00":
+                hour = "12"
+            if second % 2 == 0:
+                self.show(hour + '.' + minute + hour_suffix)
+            else:
+                self.show(hour + minute + hour_suffix)
+
+
+    def date(self):
+        if self.show_function_name(self.button1):
+            self.show(self.words['DATE'])
+        else:
+            current_time = self.rtc.datetime()
+            self.show_date(current_time, display_year=False)
+
+    def set_year(self):
+        current_time = self.rtc.datetime()
+        year, month, day, week_day, hour, minute, second, ms = current_time[0], current_time[1], current_time[2], \
+            current_time[3], current_time[4], current_time[5], 0, current_time[7]
+        digit_mapping = {
+            10: 10,
+            1: 1,
+            -1: -1,
+            -10: -10
+        }
+
+        if self.digit_pressed in digit_mapping:
+            year += digit_mapping[self.digit_pressed]
+            if year > 2100 or year < 1986: # I hope one OBC makes it to 2100!
+                year = 2025
+            current_time = (year, month, day, hour, minute, second, week_day)
+            self.rtc.datetime(current_time)
+            self.digit_pressed = 0
+        self.show_date(current_time, display_year=True)
+
+    def set_date(self):
+        current_time = self.rtc.datetime()
+        year, month, day, week_day, hour, minute, second, ms = current_time[0], current_time[1], current_time[2], \
+            current_time[3], current_time[4], current_time[5], 0, current_time[7]
+        digit_mapping = {
+            1000: (10, 0),
+            100: (1, 0),
+            10: (0, 10),
+            1: (0, 1),
+            -1: (0, -1),
+            -10: (0, -10),
+            -100: (-1, 0),
+            -1000: (-10, 0)
+        }
+
+        if self.digit_pressed in digit_mapping:
+            day_change, month_change = digit_mapping[self.digit_pressed]
+            day += day_change
+            month += month_change
+            if day > 31 or day < 1:
+                day = 1
+            if month > 12 or month < 1:
+                month = 1
+            current_time = (year, month, day, hour, minute, second, week_day)
+            self.rtc.datetime(current_time)
+            self.digit_pressed = 0
+        self.show_date(current_time, display_year=False)
+
+    def show_date(self, date_to_show, display_year=False):
+        if display_year:
+            self.show(str(date_to_show[0]))
+        else:
+            months = self.words['months']
+            day = date_to_show[2]
+            month = date_to_show[1]
+            month_str = months[month - 1]
+
+            if day < 10:
+                day_str = '0' + str(day)
+            else:
+                day_str = str(day)
+
+            self.show(day_str + ' ' + month_str)
+
+
+    def speed(self):
+        if self.show_function_name(self.button2):
+            self.show(self.words['SPEED'])
+        elif self.show_function_name(self.button9):
+            if self.speed_limit_is_active:
+                self.show('  ON  ')
+            else:
+                self.show(' OFF  ')
+        else:
+            if self.gps.has_fix():
+                speed = self.gps.parsed.speed[self.unit.speed_index]
+                self.show(str(int(speed))+self.unit.speed_acronym)
+            else:
+                self.show(self.words['SIGNAL'])
+
+
+    def set_limit(self):
+        if self.show_function_name(self.button9):
+            self.show(self.words['LIMIT'])
+        else:
+            digit_mapping = {
+                100: (100),
+                10: (10),
+                1: (1),
+                -1: (-1),
+                -10: (-10),
+                -100: (-100)
+            }
+
+            if self.digit_pressed in digit_mapping:
+                delta = digit_mapping[self.digit_pressed]
+                if self.digit_pressed in [-1, -10, -100] and self.speed_limit % 10 != 0:
+                    self.speed_limit -= self.speed_limit % 100 % 10 #TODO: Check why this is even for?
+                self.speed_limit += delta
+                if self.speed_limit > 400 or self.speed_limit < 0: # Doubt an e30 ever made it to 300
+                    self.speed_limit = 0
+                self.digit_pressed = 0
+            self.show(str(self.speed_limit) + self.unit.speed_acronym)
+
+
+    def check_for_overspeed(self):
+        # Advanced by the alarms stage, the alert itself is shown by overspeed_alert()
+        if self.displayed_function == self.overspeed_alert:
+            if not (self.speed_limit_is_active and self.gps.has_fix()
+                    and self.gps.parsed.speed[self.unit.speed_index] > self.speed_limit):
+                logging.car("> Leaving overspeed")
+                self.display.blink_rate(0)
+                self.can_switch_function = True
+                self.displayed_function = self.last_displayed_function
+        elif self.speed_limit_is_active and not self.displayed_function == self.set_limit and self.can_switch_function:
+            if self.gps.has_fix():
+                current_speed = self.gps.parsed.speed[self.unit.speed_index]
+                if current_speed > self.speed_limit:
+                    logging.car(f"> Entering overspeed at {current_speed}")
+                    self.last_displayed_function = self.displayed_function
+                    self.displayed_function = self.overspeed_alert
+                    self.can_switch_function = False
+                    self.display.blink_rate(1) #TODO: Make it blink faster?
+
+    def overspeed_alert(self):
+        # Alternates every second between LIMIT and the current speed
+        if time.ticks_ms() // 1000 % 2:
+            current_speed = self.gps.parsed.speed[self.unit.speed_index]
+            self.show(str(int(current_speed)) + self.unit.speed_acronym)
+        else:
+            self.show(self.words['LIMIT'])
+
+    def acceleration(self):
+        if self.show_function_name(self.button3):
+            self.show(self.words['ACCEL'])
+        else:
+            if self.gps.has_fix():
+                # if the acceleration timer is not running yet
+                if not self.acceleration_timer.is_running and self.acceleration_timer.start_time == None and not self.acceleration_timer.show_lap_time():
+                    acceleration = self.mpu.accel
+                    self.display.blink_rate(0)
+                    self.can_switch_function = True
+                    if self.gps.parsed.speed[2] > 2:
+                        self.show(self.words['STOP'])
+                    else:
+                        self.show(self.words['READY'])
+
+                    if acceleration.x > 0.5 and self.gps.parsed.speed[2] < 2:
+                        self.acceleration_timer.start()
+                else:
+                    # Acceleration timer is running
+                    speed_target = 100 #kmh
+                    if self.gps.parsed.speed[2] >= speed_target and self.acceleration_timer.is_running:
+                        self.acceleration_timer.display_end_time = time.ticks_add(time.ticks_ms(),4000)
+                        self.display.blink_rate(5)
+                        self.can_switch_function = False
+                        time_to_100 = self.acceleration_timer.parse_time(self.acceleration_timer.get_elapsed_time())
+                        logging.car(f"> {speed_target}kmh reached in {time_to_100}.")
+                        self.acceleration_timer.reset()
+                    if self.acceleration_timer.show_lap_time():
+                        pass
+                    else:
+                        time_to_show = self.acceleration_timer.get_elapsed_time()
+                        self.show(self.acceleration_timer.parse_time(time_to_show))
+
+            else:
+                self.show(self.words['SIGNAL'])
+
+
+    def lap_timer(self):
+        if self.wiring != "TRANS." and self.show_function_name(self.button4) or self.wiring == "TRANS." and self.show_function_name(self.button3):
+            self.show(self.words['LAP'])
+        else:
+            if self.gps.has_fix():
+                if self.laptimer.is_running:
+                    if self.laptimer.start_position is None:
+                        self.laptimer.set_start_position(self.gps.parsed)
+                    # Program goes faster than GPS updates, so we dismiss repetitive coordinates
+                    if self.gps.parsed.longitude_udeg != self.gps.previous_place['longitude'] and self.gps.parsed.latitude_udeg != self.gps.previous_place['latitude']:
+                        self.laptimer.check_for_completed_lap(self.gps.parsed)
+
+                    # At the end of a lap, we display the time, the delay with the fastest lap (if any), and the number of laps.
+                    if self.laptimer.show_lap_time():
+                        self.display.blink_rate(5)
+                        self.can_switch_function = False
+                        timer_str = self.laptimer.parse_time(self.laptimer.lap_time)
+
+                    elif self.laptimer.show_delay():
+                        self.display.blink_rate(5)
+                        self.can_switch_function = False
+                        if self.laptimer.delay > 0:
+                            timer_str = str(self.laptimer.parse_time(self.laptimer.delay, '+'))
+                        else:
+                            timer_str = str(self.laptimer.parse_time(self.laptimer.delay, '-'))
+
+                    elif self.laptimer.show_laps():
+                        self.display.blink_rate(5)
+                        self.can_switch_function = False
+                        if self.laptimer.number_of_lap < 10:
+                            timer_str = str(self.laptimer.number_of_lap - 1)+'  LAP'
+                        else:
+                            timer_str = str(self.laptimer.number_of_lap - 1)+' LAP'
+                    else:
+                        self.can_switch_function = True
+                        self.display.blink_rate(0)
+                        time_to_show = self.laptimer.get_elapsed_lap_time()
+                        timer_str = self.laptimer.parse_time(time_to_show)
+                    self.show(str(timer_str))
+                else: # If lap timer is not running
+                    if self.laptimer.show_laps():
+                        self.display.blink_rate(5)
+                        self.can_switch_function = False
+                        timer_str = "{:>6}".format(str(self.laptimer.number_of_lap))
+
+                    elif self.laptimer.show_lap_time():
+                        self.display.blink_rate(5)
+                        self.can_switch_function = False
+                        timer_str = self.laptimer.parse_time(self.laptimer.fastest_lap[0])
+                    else:
+                        self.display.blink_rate(0)
+                        self.can_switch_function = True
+                        timer_str = self.words['READY']
+                    self.show(str(timer_str))
+            else:
+                self.show(self.words['SIGNAL'])
+    
+    def set_transmission(self):
+        if self.show_function_name(self.button4):
+            self.show("TRANS.")
+        
+        #DO ZF8 TRANMSISSION RELATED STUFF HERE
+        
+    def add_fuel(self, on_time, elapsed): # ms
+        cc_per_s = (on_time/elapsed) * self.fuel_flow
+        if cc_per_s < 5 * self.cyl_nb: # Filters out noise
+            self.consumed_fuel += (on_time / 1000) * self.fuel_flow / 1000 # L
+
+    def get_consumed_fuel(self):
+        # Every pulse is integrated, however long the loop took since the last call
+        self.injector_counter.drain(self.add_fuel)
+                        
+    def mpg(self):
+        if self.show_function_name(self.button5):
+            if self.unit.system == "METRIC":
+                self.show('L/100 ')
+            else:
+                self.show('MPG')
+        else:
+            consumption_units = {"METRIC": "L10.", "IMPERI." : "MPG", "UK" : "MPG"}
+            if self.gps.trip > 0 and self.consumed_fuel > 0:
+                if self.unit.system == "METRIC":
+                    consumption = (self.consumed_fuel / self.gps.trip) * 100
+                else:
+                    miles = self.gps.trip * 0.621371
+                    gallon_value = {"IMPERI." : 3.785, "UK" : 4.546}
+                    gallons = self.consumed_fuel / gallon_value[self.unit.system]
+                    consumption = miles / gallons if gallons > 0 else 0
+                consumption = max(0, min(consumption, 99))
+                self.show("{:<4.1f}".format(consumption) + consumption_units[self.unit.system])
+            else:
+                self.show("   " + consumption_units[self.unit.system])
+            
+    def fuel_range(self):
+        def display_blank_range():
+            if self.unit.system == "METRIC":
+                self.show("    KM")
+            else:
+                self.show("    MI")
+                
+        if self.show_function_name(self.button5):
+            self.show(self.words['RANGE'])
+        else:
+            remaining_fuel = self.get_remaining_fuel() / 100
+            if self.gps.trip > 0 and self.consumed_fuel > 0:
+                l_per_km = self.consumed_fuel / self.gps.trip
+                inst_range_km = remaining_fuel / l_per_km
+                inst_range_km = max(0.0, min(inst_range_km, 999))
+                self.averaging_adjuster['sum']+= inst_range_km
+                self.averaging_adjuster['samples'] += 1
+                if self.averaging_adjuster['samples'] > 30:
+                    range_km = self.averaging_adjuster['sum']/self.averaging_adjuster['samples']
+                    self.averaging_adjuster = {'sum': 0, 'samples': 0, 'last_value': range_km}
+                else:
+                    if self.averaging_adjuster['last_value'] is None:
+                        display_blank_range()
+                        return
+                    else:
+                        range_km = self.averaging_adjuster['last_value']
+                        
+                if self.unit.system == "METRIC":
+                    self.show("{:<4.0f}KM".format(range_km))
+                else:
+                    range_mi = max(0.0, min(range_km*0.621371, 999))
+                    self.show("{:<4.0f}MI".format(range_mi))
+       
+            else:
+                display_blank_range()
+                    
+
+                
+
+
+    def get_remaining_fuel(self):  # CENTILITERS
+        fuel_millivolts_on = 3 * self.sampled_adc.read_millivolts(4)
+
+        # Convert "engine on" voltage to equivalent "engine off"
+        fuel_millivolts = fuel_millivolts_on * 920 // 1000 - 35
+
+        # Calibration table: (millivolts_off, centiliters)
+        cal = (
+            (3800, 500),
+            (3080, 1500),
+            (1260, 3500),
+            (460, 4520),
+            (20, 5500),
+        )
+
+        if fuel_millivolts >= cal[0][0]:
+            return cal[0][1]
+        if fuel_millivolts <= cal[-1][0]:
+            return cal[-1][1]
+
+        # Linear interpolation between calibration points
+        for i in range(len(cal) - 1):
+            v_hi, l_hi = cal[i]
+            v_lo, l_lo = cal[i + 1]
+            if v_lo <= fuel_millivolts <= v_hi:
+                return l_lo + (fuel_millivolts - v_lo) * (l_hi - l_lo) // (v_hi - v_lo)
+        return cal[-1][1]
+  
+  
+    def odometer(self):
+        if self.show_function_name(self.button5):
+            self.show(self.words['ODO'])
+        else:
+            value = self.stored_odometer + self.gps.trip
+            if self.unit.system in ['IMPERI.', 'UK']:
+                value = value * 0.621371
+            value = round(value,1)
+            if value%1!=0:
+                value_str = "{:>7}".format(value)
+            else:
+                value_str = "{:>6}".format(value)
+            self.show(str(value_str))
+
+    def set_odometer(self, unit):
+        odometer_value = int(self.stored_odometer)
+        factor = 1
+        if self.unit.system != "METRIC":
+            factor = 1.60934
+        if unit == 'k':
+            digit_mapping = {100: 100000, 10: 10000, 1: 1000, -1: -1000, -10: -10000, -100: -100000}
+        else:
+            digit_mapping = {1000: 1000, 100: 100, 10: 10, 1: 1, -1: -1, -10: -10, -100: -100, -1000: -1000}
+        if self.digit_pressed in digit_mapping:
+            odometer_value += factor * digit_mapping.get(self.digit_pressed, 0)
+            if odometer_value < 0:
+                odometer_value = 0
+            elif odometer_value > 999999:
+                odometer_value = 0
+            access_setting("odometer", odometer_value)
+            self.digit_pressed = 0
+
+    def odometer_digits(self):
+        odometer_value = int(self.stored_odometer)
+        if self.unit.system != "METRIC":
+            odometer_value = int(0.621371*odometer_value)
+        return self.display.zeros_before_number(str(odometer_value))
+
+    def set_odometer_thousands(self):
+        self.set_odometer('k')
+        odometer_str = self.odometer_digits()
+        if (time.ticks_ms() // 300) % 2: # Blinks the digits being set
+            self.show("   "+odometer_str[3:])
+        else:
+            self.show(odometer_str)
+
+    def set_odometer_hundreds(self):
+        self.set_odometer('h')
+        odometer_str = self.odometer_digits()
+        if (time.ticks_ms() // 300) % 2:
+            self.show(odometer_str[:3])
+        else:
+            self.show(odometer_str)
+            
+            
+    def timer_function(self):
+        if self.show_function_name(self.button6) and not self.timer.is_displayed:
+            self.show(self.words['TIMER'])
+        else:
+            if not self.timer.show_lap_time():
+                self.can_switch_function = True
+                self.display.blink_rate(0)
+                time_to_show = self.timer.get_elapsed_time()
+            else:
+                self.can_switch_function = False
+                self.display.blink_rate(5)
+                time_to_show = self.timer.lap_time
+
+            timer_str = self.timer.parse_time(time_to_show)
+            self.show(timer_str)
+
+    def get_pressure(self):
+        # Millibar if metric, else psi
+        millibar = 259 * self.sampled_adc.read_millivolts(1) // 100 - 1290
+        if millibar < 200:
+            millibar = 0
+        if self.unit.system == 'METRIC':
+            return millibar
+        else:
+            return millibar * 145038 // 10_000_000
+
+
+    def pressure(self):
+        if self.show_function_name(self.button7):
+            self.show(self.words['OIL'])
+        else:
+            pressure = self.get_pressure()
+            if self.unit.system == 'METRIC':
+                pressure = (pressure + 50) // 100 # Tenths of bar
+            else:
+                pressure *= 10
+            self.show("{:<4}".format(tenths(pressure)) + self.unit.pressure_acronym)
+             
+    def set_max_temperature(self):
+        if self.show_function_name(self.button9):
+            self.show(' MAX.')
+        else:
+            digit_mapping = {-100, -10, -1, 1, 10, 100}
+
+            if self.digit_pressed in digit_mapping:
+                self.sensor_getting_set.threshold += self.digit_pressed
+                self.digit_pressed = 0
+                sensor_limits = {
+                    "oil": (0, 150),
+                    "water": (0, 150),
+                    "exhaust": (0, 900)
+                }
+                if self.sensor_getting_set.name in sensor_limits:
+                    min_limit, max_limit = sensor_limits[self.sensor_getting_set.name]
+                    if not (min_limit <= self.sensor_getting_set.threshold <= max_limit):
+                        self.sensor_getting_set.threshold = 0
+                                
+            max_temperature_str = self.sensor_getting_set.formatted_temperature(self.sensor_getting_set.threshold,self.unit.temperature_acronym)
+            self.show(max_temperature_str)
+
+    def check_for_overheat(self):
+        # Advanced by the alarms stage, the alert itself is shown by overheat_alert()
+        if self.displayed_function == self.overheat_alert:
+            sensor = self.sensor_getting_set
+            self.overheat_temperature = sensor.get_temperature(self.unit.temperature_acronym)
+            if not (sensor.limit_is_active and self.overheat_temperature > sensor.threshold):
+                logging.car(f">{sensor.name} alarm stopped. Temperature: {self.overheat_temperature}")
+                self.display.blink_rate(0)
+                self.can_switch_function = True
+                self.displayed_function = self.last_displayed_function
+        elif not self.displayed_function == self.set_max_temperature and self.can_switch_function:
+            sensor_list = [self.oil_temp_sensor,self.water_temp_sensor,self.exhaust_temp_sensor]
+            for sensor in sensor_list:
+                if sensor.limit_is_active:
+                    temperature = sensor.get_temperature(self.unit.temperature_acronym)
+                    if temperature > sensor.threshold:
+                        logging.car(f">{sensor.name} overheating! Temperature: {temperature}")
+                        self.can_switch_function = False
+                        self.last_displayed_function = self.displayed_function
+                        self.displayed_function = self.overheat_alert
+                        self.sensor_getting_set = sensor
+                        self.overheat_temperature = temperature
+                        self.display.blink_rate(1)
+                        break
+
+    def overheat_alert(self):
+        # Alternates every second between the sensor's name and its temperature
+        if time.ticks_ms() // 1000 % 2:
+            self.show(self.sensor_getting_set.formatted_temperature(self.overheat_temperature, self.unit.temperature_acronym))
+        else:
+            self.show(self.sensor_getting_set.name.upper())
+                        
+    def oil_temperature(self):
+        if self.show_function_name(self.button7):
+            self.show(self.words['TEMP'])
+        elif self.show_function_name(self.button9):
+            if self.oil_temp_sensor.limit_is_active:
+                self.show('  ON  ')
+            else:
+                self.show(' OFF  ')
+        else:
+            self.show(self.oil_temp_sensor.get_averaged_temperature(self.unit.temperature_acronym))
+
+
+    def water_temperature(self): #CUST.1 sensors needed
+        if self.show_function_name(self.button7):
+            self.show('WATER')
+        elif self.show_function_name(self.button9):
+            if self.water_temp_sensor.limit_is_active:
+                self.show('  ON  ')
+            else:
+                self.show(' OFF  ')
+        else:
+            self.show(self.water_temp_sensor.get_averaged_temperature(self.unit.temperature_acronym))
+            
+    def exhaust_temperature(self): #CUST.1 sensors needed
+        if self.show_function_name(self.button7):
+            self.show('EXH.TMP.')
+        elif self.show_function_name(self.button9):
+            if self.exhaust_temp_sensor.limit_is_active:
+                self.show('  ON  ')
+            else:
+                self.show(' OFF  ')
+        else:
+            temperature = self.exhaust_temp_sensor.get_averaged_temperature(self.unit.temperature_acronym, formatted = False)
+            if temperature == 25:
+                self.show(" COLD ")
+            else:
+                self.show(self.exhaust_temp_sensor.formatted_temperature(temperature, self.unit.temperature_acronym))
+            
+
+    def get_voltage(self):  # MILLIVOLTS
+        return 3 * self.sampled_adc.read_millivolts(2)
+
+    def voltage(self):
+        if self.show_function_name(self.button7):
+            self.show(self.words['VOLT'])
+        else:
+            current_voltage = self.get_voltage()
+            self.averaging_adjuster['sum']+= current_voltage
+            self.averaging_adjuster['samples']+=1
+            if self.averaging_adjuster['samples'] > 10:
+                averaged_voltage = self.averaging_adjuster['sum']//self.averaging_adjuster['samples']
+                self.averaging_adjuster = {'samples':0,'sum':0,'last_value':averaged_voltage}
+                self.show("{:<6}V".format(tenths((averaged_voltage + 50) // 100)))
+            else:
+                averaged_voltage = self.averaging_adjuster.get('last_value')
+                if averaged_voltage is None:
+                    self.show("     V")
+                else:
+                    self.show("{:<6}V".format(tenths((averaged_voltage + 50) // 100)))
+ 
+
+
+    def out_temperature(self): #TODO: <3 degrees alert
+        if self.show_function_name(self.button8):
+            self.show(self.words['OUTEMP'])
+        elif self.show_function_name(self.button9):
+            if self.out_temp_sensor.limit_is_active:
+                self.show('  ON  ')
+            else:
+                self.show(' OFF  ')
+        else:
+            self.show(self.out_temp_sensor.get_averaged_temperature(self.unit.temperature_acronym))
+       
+
+    def altitude(self):
+        if self.show_function_name(self.button8):
+            self.show(self.words['ALT'])
+        else:
+            if self.gps.has_fix():
+                if self.unit.system == 'METRIC':
+                    altitude = self.gps.parsed.altitude
+                else:
+                    altitude = self.gps.parsed.altitude * 3.28084
+                self.show(str(int(altitude)) + self.unit.altitude_acronym)
+            else:
+                self.show(self.words['SIGNAL'])
+
+    def heading(self):
+        if self.show_function_name(self.button8):
+            self.show(self.words['HDG'])
+        else:
+            if self.gps.has_fix():
+                compass_direction = self.gps.compass_direction()
+                heading = self.gps.parsed.course
+                self.show(str(int(heading)) + compass_direction)
+            else:
+                self.show(self.words['SIGNAL'])
+
+    def g_sensor(self):
+        if self.show_function_name(self.button8):
+            self.show(self.words['G SENS'])
+        else:
+            g_error = self.g_error
+            acceleration = self.mpu.accel
+            g_vector = ((acceleration.x + (g_error[0]/10)) ** 2 + (acceleration.z + (g_error[1]/10)) **2) ** 0.5
+            self.averaging_adjuster['sum'] += g_vector
+            self.averaging_adjuster['samples'] += 1
+            if self.averaging_adjuster['samples'] > 10:
+                averaged_g = self.averaging_adjuster['sum']/self.averaging_adjuster['samples']
+                self.averaging_adjuster = {'samples':0,'sum':0,'last_value':averaged_g}
+            else:
+                averaged_g = self.averaging_adjuster.get('last_value')
+                if averaged_g is None:
+                    self.show("     G")
+                else:
+                    self.show("{:<6.1f}G".format(averaged_g))
+
+
+# ----------------------------SETTINGS FUNCTIONS-------------------------------
+
+    def set_setting(self):
+        digit_mapping = {10,1,-1,-10}
+        if self.digit_pressed in digit_mapping:
+            self.setting_index+=self.digit_pressed
+            if self.setting_index>14 or self.setting_index < 0:
+                self.setting_index = 0
+            self.digit_pressed = 0
+        self.show('SET{:>3}'.format(str(self.setting_index)))
+
+    def set_language(self):
+        if self.show_function_name(self.button9):
+            self.show('LANGUA.')
+        else:
+            language = access_setting('language')
+            possible_languages = ['EN','FR','DE']
+            index = possible_languages.index(language)
+            digit_mapping = {1:1, -1:-1}
+            if self.digit_pressed in digit_mapping:
+                index+= digit_mapping[self.digit_pressed]
+                if index >= len(possible_languages) or index < 0:
+                    index = 0
+                access_setting('language',possible_languages[index])
+                self.digit_pressed = 0
+            self.show(access_setting('language'))
+
+    def set_clock_format(self):
+        if self.show_function_name(self.button9):
+            self.show('12/24')
+        else:
+            if self.clock_format == 24:
+                self.show('24H')
+            else:
+                self.show('12AMPM')
+            if self.digit_pressed in [-1,1]:
+                access_setting('clock_format', 12 if self.clock_format == 24 else 24)
+                self.digit_pressed = 0
+
+    def set_unit(self):
+        if self.show_function_name(self.button9):
+            self.show('UNIT')
+        else:
+            unit = access_setting('unit')
+            possible_units = ['METRIC','IMPERI.', 'UK']
+            index = possible_units.index(unit)
+            digit_mapping = [1, -1]
+            if self.digit_pressed in digit_mapping:
+                index+=self.digit_pressed
+                if index >= 3 or index < 0:
+                    index = 0
+                access_setting('unit', possible_units[index])
+                self.digit_pressed = 0
+            self.show(access_setting('unit'))
+
+    def sw_update(self):
+        if self.show_function_name(self.button9):
+            self.show('UPDATE')
+        else:
+            self.show(' WIFI ')
+            self.can_switch_function = False
+            self.supervisor.enter_maintenance() # The stages are over, this ends in a reset or the setup server
+            governor.set_level('boost') # Before the WiFi chip's bus is set up
+            self.acquisition.stop() # Frees the second core for the update handlers
+            import fota_master
+            from FOTA import connect_to_wifi, is_connected_to_wifi
+            from FOTA.ota import OTAUpdater
+            try:
+                os.stat("wifi.json")
+                with open("wifi.json", 'r') as f:
+                    wifi_current_attempt = 1
+                    wifi_credentials = json.load(f)
+
+                while (wifi_current_attempt < 3):
+                    try:
+                        ip_address = connect_to_wifi(wifi_credentials["ssid"], wifi_credentials["password"])
+                    except:
+                        logging.exception('> Exception occured while connecting to wifi.')
+                    if is_connected_to_wifi():
+                        logging.debug(f"> Connected to wifi, IP address {ip_address}")
+                        self.show('CNNCTD')
+                        time.sleep(2)
+                        self.show(wifi_credentials["ssid"][:6])
+                        time.sleep(2)
+                        break
+                    else:
+                        wifi_current_attempt += 1
+
+            except OSError:
+                logging.debug("> OSError occured as wifi.json doesn't exist")
+                with open('wifi.json', 'w') as f:
+                    json.dump({}, f)
+
+            if is_connected_to_wifi():
+                logging.debug("> Entering update mode.")
+                firmware_url = "https://github.com/80sEngineering/OBC/"
+                ota_updater = OTAUpdater(firmware_url) # Fetches the files listed in the release's version.json
+                ota_updater.check_for_updates()
+                if ota_updater.newer_version_available:
+                    self.show('NEW'+'{:>3}'.format('V'+str(ota_updater.latest_version)))
+
+                    time.sleep(2)
+                    self.show('UPDATE')
+                    time.sleep(2)
+
+                    ota_updater.download_update_and_reset()
+
+                else:
+                    logging.debug("> No new updates available.")
+                    self.show('LATEST')
+                    time.sleep(2)
+                    self.show('VERS.'+'{:>2}'.format(str(ota_updater.current_version)))
+                    time.sleep(2)
+                    self.display.clear()
+                    self.display.show()
+                    fota_master.machine_reset()
+
+            else:
+                logging.debug(f"> Something went wrong, going into setup mode.")
+                fota_master.setup_mode()
+
+            self.scheduler.stop() # loop() hands over to the setup server
+
+
+    def set_display_brightness(self):
+        if self.show_function_name(self.button9):
+            self.show('BRIGHT')
+        else:
+            brightness = self.display.brightness()
+            self.show("{:>6}".format(brightness))
+            if self.digit_pressed in [1,-1]:
+                brightness+=self.digit_pressed
+                if brightness >= 16 or brightness < 0:
+                    brightness = 0
+                access_setting('display_brightness',brightness)
+                self.digit_pressed = 0
+
+
+    def set_sensors(self):
+        if self.show_function_name(self.button9):
+            self.show('SENSOR')
+        else:
+            sensors = access_setting('sensors')
+            sensors_list = ["V","V+OIL","CUST.1"]
+            self.show(sensors)
+            if self.digit_pressed in [1,-1]:
+                try:
+                    index = sensors_list.index(sensors)
+                except ValueError:
+                    index = 0
+                index = (index + self.digit_pressed) % 3
+                access_setting('sensors', sensors_list[index])
+                self.digit_pressed = 0
+
+    def set_outdoor_temp(self):
+        if self.show_function_name(self.button9):
+            self.show('OUTEMP.')
+        else:
+            got_sensor = access_setting('outdoor_sensor')
+            self.show(got_sensor)
+            if self.digit_pressed in [1,-1]:
+                if got_sensor == "FITTED":
+                    got_sensor = "NONE"
+                else:
+                    got_sensor = "FITTED"
+                self.digit_pressed = 0
+                access_setting('outdoor_sensor', got_sensor)
+
+
+    def set_wiring(self):
+        if self.show_function_name(self.button9):
+            self.show('WIRING')
+        else:
+            wiring = access_setting('wiring')
+            wiring_list = ['CLOCK','OBC6','OBC13','TRANS.']
+            self.show(str(wiring))
+            if self.digit_pressed in [1,-1]:
+                try:
+                    index = wiring_list.index(str(wiring))
+                except ValueError:
+                    index = 0
+                index = (index + self.digit_pressed) % len(wiring_list)
+                wiring = wiring_list[index]
+                access_setting('wiring', wiring) #TODO: Add safety in case CLOCK changes wiring.
+                self.digit_pressed = 0
+
+
+    def set_auto_off(self):
+        if self.show_function_name(self.button9):
+            self.show('AUT.OFF')
+        else:
+            auto_off_delay = access_setting('auto_off_delay')
+            self.show(str(auto_off_delay)+'H')
+            digit_mapping = {10:10,1:1, -1:-1,-10:-10}
+            if self.digit_pressed in digit_mapping:
+                auto_off_delay += self.digit_pressed
+                self.digit_pressed = 0
+                if auto_off_delay < 1 or auto_off_delay > 24:
+                    auto_off_delay = 1
+                access_setting('auto_off_delay',auto_off_delay)
+
+
+
+    def set_gsensor_error(self):
+        if self.show_function_name(self.button9):
+            self.show('G.ERROR')
+        else:
+            g_error = access_setting('g_error')
+            self.show('X'+str(g_error[0])+'Y'+str(g_error[1]))
+            x_digit_mapping = [10, -10]
+            y_digit_mapping = [1, -1]
+            if self.digit_pressed in x_digit_mapping:
+                if -10 <= g_error[0] + self.digit_pressed / 10 < 10:
+                     g_error[0] += int(self.digit_pressed / 10)
+                access_setting('g_error',g_error)
+            elif self.digit_pressed in y_digit_mapping:
+                if -10 < g_error[1] + self.digit_pressed < 10:
+                    g_error[1] += int(self.digit_pressed)
+                access_setting('g_error',g_error)
+            self.digit_pressed = 0
+
+    def set_logging(self):
+        if self.show_function_name(self.button9):
+            self.show('LOG')
+        else:
+            all_logging_types = [0b111111,0b111110,0]
+            current_logging_types = logging._logging_types
+            if current_logging_types == 0b111111:
+                self.show('DEBUG')
+            elif current_logging_types == 0b111110:
+                self.show('NORMAL')
+            elif current_logging_types == 0:
+                self.show('NONE')
+        digit_mapping = {1,-1}
+        if self.digit_pressed in digit_mapping:
+            index = all_logging_types.index(current_logging_types)
+            index = (index + self.digit_pressed) % 3
+            logging._logging_types = all_logging_types[index]
+            profiler.enable(logging._logging_types & logging.LOG_DEBUG)
+            self.digit_pressed = 0
+
+    def set_injector_cc(self):
+        if self.show_function_name(self.button9):
+            self.show('INJ. CC')
+        else:
+            injector_cc = access_setting("inj_cc")
+            self.show(f"{injector_cc} CC")
+            digit_mapping = {100,10,1,-1,-10,-100}
+            if self.digit_pressed in digit_mapping:
+                injector_cc += self.digit_pressed
+                if injector_cc < 100:
+                    injector_cc = 800
+                elif injector_cc > 800:
+                    injector_cc = 100
+                access_setting("inj_cc",injector_cc)
+                self.digit_pressed = 0
+
+
+    def set_cyl_nb(self):
+        if self.show_function_name(self.button9):
+            self.show('CYL. NB')
+        else:
+            cyl_nb = access_setting("cyl_nb")
+            self.show("{:<3}CYL".format(cyl_nb))
+            if self.digit_pressed in {-1,1}:
+                possible_cyl_nb = [4, 6, 8, 10, 12,'WTF']
+                index = (possible_cyl_nb.index(cyl_nb) + self.digit_pressed) % len(possible_cyl_nb)
+                cyl_nb = possible_cyl_nb[index]
+                if cyl_nb == 'WTF':
+                    self.show(' WTF  ')
+                    cyl_nb = 4
+                    time.sleep(1)
+                access_setting("cyl_nb", cyl_nb)
+                self.digit_pressed = 0
+
+
+    def set_injector_calibration(self):
+        if self.show_function_name(self.button9):
+            self.show('INJ.CAL.')
+        else:
+            calibration_factor = access_setting('inj_cal')
+            self.show("{:>6}".format(calibration_factor))
+            if self.digit_pressed in {-100,-10,-1,1,10,100}:
+                calibration_factor += self.digit_pressed
+                if calibration_factor > 999:
+                    calibration_factor = 1
+                elif calibration_factor < 1:
+                    calibration_factor = 1
+                access_setting('inj_cal', calibration_factor)
+                self.digit_pressed = 0
+
+    
+    def set_tank_volume(self):
+        if self.show_function_name(self.button9):
+            self.show('TANK')
+        else:
+            tank_volume = int(access_setting('tank'))
+            self.show("{:<3}  L".format(tank_volume))
+            if self.digit_pressed in {-1,1}:
+                tank_volume = 60 if tank_volume == 55 else 55
+                access_setting('tank', tank_volume)
+                self.digit_pressed = 0
+            
+# -------------------------------INFINITE-LOOP---------------------------------
+
+    def acquire(self): # Run by the acquisition engine
+        start = time.ticks_us()
+        self.gps.get_GPS_data() # computing travelled distance
+        profiler.record('gps', start)
+        if self.wiring in ["OBC13", "TRANS."]:
+            start = time.ticks_us()
+            self.get_consumed_fuel()
+            profiler.record('fuel', start)
+
+    def render(self):
+        self.led.toggle()
+        self.acquisition.read(self.samples)
+        start = time.ticks_us()
+        self.displayed_function()
+        profiler.record('displayed_function', start)
+
+    def check_alarms(self):
+        self.acquisition.read(self.samples)
+        start = time.ticks_us()
+        self.check_for_overheat()
+        profiler.record('overheat', start)
+        start = time.ticks_us()
+        self.check_for_overspeed()
+        profiler.record('overspeed', start)
+
+    def idle(self):
+        # Powered off, on permanent 12V: the RPi sleeps until an IRQ (ignition, buttons, stalk) or a timer
+        # (the watchdog's check, every second) wakes it up. The clock is kept by the DS3231.
+        if not self.powered:
+            lightsleep(self.idle_sleep)
+            governor.check()
+
+    def save_checkpoint(self):
+        self.trip_checkpoint.update(self.stored_odometer, self.gps.trip, self.consumed_fuel)
+
+    def loop(self):
+        # Each stage runs at its own period (ms), so a slow one doesn't hold back the others
+        self.scheduler = Scheduler(condition = lambda: self.powered)
+        self.acquisition_threaded = self.acquisition.start()
+        if not self.acquisition_threaded:
+            self.scheduler.add('acquisition', self.acquisition.step, 20)
+        self.scheduler.add('display', self.render, 50)
+        self.scheduler.add('alarms', self.check_alarms, 200)
+        self.scheduler.add('checkpoint', self.save_checkpoint, 1000)
+        gc_policy.init()
+        self.scheduler.add('gc', lambda: gc_policy.step(self.scheduler.slack()), 100) # freeing memory space, when there's time
+        governor.init(self.acquisition.lock)
+        governor.on_change(self.frequency_changed)
+        self.scheduler.add('power', self.power_stage, 50, always = True)
+        self.scheduler.add('governor', self.govern, 500, always = True)
+        self.scheduler.add('idle', self.idle, 100, always = True)
+        self.supervisor.watch('acquisition', self.acquisition.last_beat, 2000)
+        self.scheduler.supervisor = self.supervisor
+        self.supervisor.start(self.scheduler)
+        self.render() # First frame, the clock
+        profiler.mark('first frame')
+        logging.info(f"> Boot {profiler.boot_report(', ')}") # One append to the log file, it is on the boot path
+        self.scheduler.run()
+        # Only reached when sw_update() stopped the scheduler to enter setup mode
+        from FOTA import server
+        server.run()
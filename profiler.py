@@ -0,0 +1,102 @@
+import time
+import _thread
+import logging
+from array import array
+
+# Per stage timings, in us, kept as a log2 histogram: bucket n counts the
+# durations below 2**n us (and at least 2**(n-1)), the last bucket
+# everything longer. Memory use doesn't grow with the number of samples,
+# and the bucket holding the 95th percentile is enough to find the stage
+# making a frame late.
+_BUCKETS = 20 # The last one starts at ~262ms
+
+enabled = False
+
+_stages = {}
+_boot = [] # (phase, ticks_us() when it ended), ticks_us() counts from the reset
+_lock = _thread.allocate_lock() # Stages are recorded from both cores
+
+
+class _Stage:
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+        self.buckets = array('I', [0] * _BUCKETS)
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        if self.min is None or duration < self.min:
+            self.min = duration
+        if duration > self.max:
+            self.max = duration
+        bucket = 0
+        while bucket < _BUCKETS - 1 and duration >> bucket:
+            bucket += 1
+        self.buckets[bucket] += 1
+
+    def percentile(self, p):
+        # Upper bound of the bucket holding the p-th percentile
+        target = self.count * p / 100
+        seen = 0
+        for bucket in range(_BUCKETS - 1):
+            seen += self.buckets[bucket]
+            if seen >= target:
+                return min(1 << bucket, self.max)
+        return self.max
+
+
+def enable(state = True):
+    global enabled
+    if enabled and not state:
+        dump()
+    enabled = bool(state)
+    logging.info(f"> Profiler {'enabled' if enabled else 'disabled'}")
+
+def reset():
+    with _lock:
+        _stages.clear()
+
+def add(name, duration):
+    # Adds a duration (us) measured by the caller
+    if not enabled:
+        return
+    with _lock:
+        stage = _stages.get(name)
+        if stage is None:
+            stage = _stages[name] = _Stage()
+        stage.add(duration)
+
+def record(name, start):
+    # Adds the time elapsed since start, a time.ticks_us() value
+    if enabled:
+        add(name, time.ticks_diff(time.ticks_us(), start))
+
+def mark(phase):
+    # Boot timeline, recorded whether profiling is enabled or not
+    _boot.append((phase, time.ticks_us()))
+
+def boot_report(separator = "\n"):
+    lines = []
+    previous = 0
+    for phase, end in _boot:
+        lines.append(f"{phase}: {end}us (+{time.ticks_diff(end, previous)}us)")
+        previous = end
+    return separator.join(lines)
+
+def report():
+    """ Returns one line per stage: samples, min/mean/p95/max in us, then the histogram's buckets."""
+    lines = []
+    with _lock:
+        for name in sorted(_stages):
+            stage = _stages[name]
+            lines.append(f"{name}: n={stage.count} min={stage.min} mean={stage.total // stage.count} "
+                         f"p95={stage.percentile(95)} max={stage.max} buckets={list(stage.buckets)}")
+    return "\n".join(lines + ["boot " + line for line in boot_report().split("\n") if line])
+
+def dump():
+    for line in report().split("\n"):
+        if line:
+            logging.info(f"> Profile {line}")
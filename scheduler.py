@@ -0,0 +1,78 @@
+import uasyncio
+import time
+import logging
+import profiler
+
+
+class Stage:
+    def __init__(self, name, function, period, deadline, index, always):
+        self.name = name
+        self.function = function
+        self.period = period # ms
+        self.deadline = deadline # ms, the longest the stage may wait to start again, see watchdog.py
+        self.index = index
+        self.always = always # Runs even when the scheduler's condition is False
+        self.last_run = time.ticks_ms()
+
+
+class Scheduler:
+    """ Cooperative scheduler running each stage of the OBC as its own uasyncio task, at its own period.
+
+    A stage is a plain function run to completion, so a slow stage only delays the others by its own
+    duration. Stages due at the same time run in the order they were added: add the most urgent first.
+    Stages are skipped while condition() is False, unless they were added with always."""
+    def __init__(self, condition = lambda: True):
+        self.condition = condition
+        self.stages = []
+        self.supervisor = None
+        self._tasks = []
+        self._stop_event = uasyncio.Event()
+
+    def add(self, name, function, period, deadline = None, always = False):
+        # The default deadline leaves room for the few blocking waits on the user (2s at most)
+        if deadline is None:
+            deadline = period + 3000
+        self.stages.append(Stage(name, function, period, deadline, len(self.stages), always))
+
+    async def _run_stage(self, stage):
+        while True:
+            start = time.ticks_ms()
+            stage.last_run = start
+            if stage.always or self.condition():
+                start_us = time.ticks_us()
+                if self.supervisor:
+                    self.supervisor.enter(stage.index)
+                try:
+                    stage.function()
+                except Exception as e:
+                    logging.exception(f"> Stage {stage.name} failed: {e}")
+                if self.supervisor:
+                    self.supervisor.leave()
+                profiler.record(stage.name, start_us)
+            # Fixed rate: the time spent in the stage is part of its period
+            elapsed = time.ticks_diff(time.ticks_ms(), start)
+            await uasyncio.sleep_ms(max(0, stage.period - elapsed))
+
+    async def _main(self):
+        self._tasks = [uasyncio.create_task(self._run_stage(stage)) for stage in self.stages]
+        await self._stop_event.wait()
+        for task in self._tasks:
+            task.cancel()
+
+    def run(self):
+        """ Runs the stages until stop() is called."""
+        logging.debug(f"> Scheduler running {[(stage.name, stage.period) for stage in self.stages]}")
+        uasyncio.run(self._main())
+
+    def slack(self):
+        """ Returns the ms left before the next stage is due."""
+        now = time.ticks_ms()
+        slack = None
+        for stage in self.stages:
+            due = stage.period - time.ticks_diff(now, stage.last_run)
+            if slack is None or due < slack:
+                slack = due
+        return slack
+
+    def stop(self):
+        self._stop_event.set()
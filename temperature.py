@@ -1,25 +1,44 @@
 from math import log
+from array import array
+
+# ADC channel of each sensor
+_CHANNELS = {'oil': 0, 'out': 3, 'water': 7, 'exhaust': 5}
+
+# Temperatures are read through a table of the sensor's curve, computed
+# at the first reading, so a sensor that isn't read costs nothing at boot:
+# one point every 2**_TABLE_SHIFT ADC codes, in centi-degrees C.
+# A reading is then an integer interpolation between two points, with no
+# float, so nothing to allocate.
+_TABLE_SHIFT = 4
+_TABLE_STEP = 1 << _TABLE_SHIFT
 
 class Temperature:
     def __init__(self, name, adc):
         self.name = name
         self.adc = adc
+        self.channel = _CHANNELS[name]
         self.refresh_rate_adjuster = {'samples': 0, 'sum': 0, 'last_value': None}
         self.threshold = 0
         self.limit_is_active = False
+        self.table = None # See build_table()
+
+    def build_table(self):
+        self.table = array('i', [round(self.celsius(5.2 * min(max(code, 1), 4095) / 4096) * 100)
+                                 for code in range(0, 4096 + _TABLE_STEP, _TABLE_STEP)])
+        return self.table
 
     def formatted_temperature(self, temperature, acronym):
         if temperature is not None:
             if temperature < -50:  # -50C ~= -50F
                 return 'NODATA'
-            temperature_str = "{:<5.0f}{}".format(temperature, acronym)
+            temperature_str = "{:<5}{}".format(temperature, acronym)
         else:
             temperature_str = "{:>6}".format(acronym)
         return temperature_str
 
-    def get_temperature(self, acronym, formatted=False):
+    def celsius(self, adc_voltage):
+        # The sensor's curve, only used to build the table
         if self.name == "oil":
-            adc_voltage = self.adc.read_voltage(0)
             try:
                 RNTC = (5000 / adc_voltage) - 1000
             except ZeroDivisionError:
@@ -27,19 +46,17 @@ class Temperature:
             A = 1.291780e-3
             B = 2.612878e-4
             C = 1.568296e-7
-        
+
         elif self.name == "out":
-            adc_voltage = self.adc.read_voltage(3)
             try:
                 RNTC = (adc_voltage * 4700) / (5 - adc_voltage)
-            except ZeroDivisionError: 
+            except ZeroDivisionError:
                 RNTC = 10000
             A = 1.327871e-3
             B = 2.297980e-4
             C = 1.375199e-7
-        
+
         elif self.name == "water":
-            adc_voltage = self.adc.read_voltage(7)
             try:
                 RNTC = (adc_voltage/(5-adc_voltage))*4700
             except ZeroDivisionError:
@@ -47,11 +64,10 @@ class Temperature:
             A = 1.51646e-3
             B = 2.397145e-4
             C = 0.20817e-7
-        
+
         elif self.name == 'exhaust':
             temp_C = [25, 50, 100, 150, 200, 400, 600, 800]
             resistance = [220, 240, 275, 313, 350, 488, 620, 740]
-            adc_voltage = self.adc.read_voltage(5)
             try:
                 RNTC = ((3.33 / adc_voltage) - 1) * 315
             except ZeroDivisionError:
@@ -67,33 +83,42 @@ class Temperature:
                 temperature = temp_C[0]
             if RNTC >= resistance[-1]:
                 temperature = temp_C[-1]
-        
+
         if self.name in ["oil","out","water"]:
             try:
                 temperature = 1 / (A + B * log(RNTC) + C * (log(RNTC))**3)
             except:
                 temperature = 222
             temperature -= 273.15  # K to C
-            
-            
+        return temperature
+
+    def read_centidegrees(self):
+        # Celsius, x100
+        table = self.table
+        if table is None:
+            table = self.build_table()
+        code = self.adc.read_value(self.channel)
+        index = code >> _TABLE_SHIFT
+        low = table[index]
+        return low + (((table[index + 1] - low) * (code & (_TABLE_STEP - 1))) >> _TABLE_SHIFT)
+
+    def get_temperature(self, acronym, formatted=False):
+        # Whole degrees, in the unit of acronym
+        temperature = self.read_centidegrees()
         if acronym == "F":
-            temperature = (temperature * 1.8) + 32
-        
+            temperature = (temperature * 9) // 5 + 3200
+        temperature = (temperature + 50) // 100
+
         return self.formatted_temperature(temperature, acronym) if formatted else temperature
-    
+
     def get_averaged_temperature(self,acronym, formatted=True):
         current_temperature = self.get_temperature(acronym, formatted=False)
         self.refresh_rate_adjuster['sum'] += current_temperature
         self.refresh_rate_adjuster['samples'] += 1
-        
+
         if self.refresh_rate_adjuster['samples'] >= 10:  # Adjust sample count for slower refresh
-            averaged_temperature = self.refresh_rate_adjuster['sum'] / self.refresh_rate_adjuster['samples']
+            averaged_temperature = self.refresh_rate_adjuster['sum'] // self.refresh_rate_adjuster['samples']
             self.refresh_rate_adjuster = {'samples': 0, 'sum': 0, 'last_value': averaged_temperature}
         else:
             averaged_temperature = self.refresh_rate_adjuster.get('last_value')
         return self.formatted_temperature(averaged_temperature, acronym) if formatted else averaged_temperature
-
-
-
-
-
@@ -1,4 +1,4 @@
-from memory import access_setting
+from memory import access_settings, subscribe
 
 class Unit:
     def __init__(self,system):
@@ -10,9 +10,10 @@ class Unit:
         self.altitude_acronym = None
         self.volume_acronym = None
         self.update()
+        subscribe(("unit", "language"), lambda setting_type, value: self.update())
         
     def update(self):
-        self.language = access_setting("language")
+        self.system, self.language = access_settings(("unit", "language"))
         self.set_speed_acronym()
         self.set_speed_index()
         self.set_pressure_acronym()
@@ -0,0 +1,157 @@
+import time
+import os
+import logging
+import ujson as json
+from machine import WDT, Timer, mem32
+
+crash_file = 'crash.json'
+_crash_records = 8 # Only the newest ones are kept
+
+# RP2040 watchdog registers. The scratch registers are kept through a
+# watchdog reset, 0-3 are free: the SDK uses 4-7. Scratch 4 holds the SDK's
+# magic when the reset was caused by a WDT that timed out, rather than by
+# machine.reset(), which reboots through the watchdog too.
+_WATCHDOG = 0x40058000
+_REASON = _WATCHDOG + 0x08
+_SCRATCH_RUNNING = _WATCHDOG + 0x0c # Stage running, written on entering each one
+_SCRATCH_LATE = _WATCHDOG + 0x10    # Stage found late by the supervisor
+_SCRATCH4 = _WATCHDOG + 0x1c
+_NON_REBOOT_MAGIC = 0x6ab73121
+_MAGIC = 0x0bc00000
+_NONE = 0xff
+
+
+class Supervisor:
+    """ Feeds the hardware watchdog only while every stage meets its deadline.
+
+    A stage meets it if it started within its deadline (see Scheduler.add), a heartbeat if its last beat is
+    that recent. Checked from a timer, so it also runs while a stage loops, but not if a driver hangs in C:
+    either way the watchdog resets the OBC. The stage running and the one found late are kept in the
+    watchdog's scratch registers and turned into a crash record at the next boot, a late stage is also
+    recorded right away, in case it recovers. Code knowingly blocking the stages, a wait on the user for
+    instance, does it between hold() and release()."""
+    def __init__(self, timeout = 8000, period = 1000):
+        self.timeout = timeout # ms, at most 8388 on the RP2040
+        self.period = period   # ms between two checks
+        self.scheduler = None
+        self.heartbeats = []
+        self.wdt = None
+        self.maintenance = False
+        self.held = 0 # Depth of hold()
+        self.released = None # ticks_ms of the last release(), the deadlines count from there
+        self.late = None
+        self._timer = Timer()
+
+    def watch(self, name, last_beat, deadline):
+        # last_beat() returns the ticks_ms of the last beat, None while it isn't expected
+        self.heartbeats.append((name, last_beat, deadline))
+
+    def names(self):
+        return [stage.name for stage in self.scheduler.stages] + [heartbeat[0] for heartbeat in self.heartbeats]
+
+    def enter(self, index):
+        # Called by the scheduler before each stage, then leave() after it
+        mem32[_SCRATCH_RUNNING] = _MAGIC | index
+
+    def leave(self):
+        mem32[_SCRATCH_RUNNING] = _MAGIC | _NONE
+
+    def start(self, scheduler):
+        self.scheduler = scheduler
+        self.check_last_reset()
+        mem32[_SCRATCH_RUNNING] = _MAGIC | _NONE
+        mem32[_SCRATCH_LATE] = _MAGIC | _NONE
+        self.wdt = WDT(timeout = self.timeout)
+        self._timer.init(mode = Timer.PERIODIC, period = self.period, callback = self._check)
+        logging.debug(f"> Watchdog started, {self.timeout}ms")
+
+    def feed(self):
+        if self.wdt is not None:
+            self.wdt.feed()
+
+    def hold(self):
+        # The stages are knowingly blocked until release(): only feeds meanwhile
+        self.held += 1
+        self.feed()
+
+    def release(self):
+        self.held -= 1
+        if not self.held:
+            self.released = time.ticks_ms()
+
+    def enter_maintenance(self):
+        # The stages won't run anymore (software update): only feeds from now on
+        self.maintenance = True
+        self.feed()
+
+    def late_stage(self):
+        # Returns (index, ms over the deadline) of the latest stage or heartbeat, or None
+        now = time.ticks_ms()
+        released = self.released
+        late = None
+        index = 0
+        for stage in self.scheduler.stages:
+            since = stage.last_run
+            if released is not None and time.ticks_diff(released, since) > 0:
+                since = released
+            overrun = time.ticks_diff(now, since) - stage.deadline
+            if overrun > 0 and (late is None or overrun > late[1]):
+                late = (index, overrun)
+            index += 1
+        for name, last_beat, deadline in self.heartbeats:
+            beat = last_beat()
+            if beat is not None:
+                if released is not None and time.ticks_diff(released, beat) > 0:
+                    beat = released
+                overrun = time.ticks_diff(now, beat) - deadline
+                if overrun > 0 and (late is None or overrun > late[1]):
+                    late = (index, overrun)
+            index += 1
+        return late
+
+    def _check(self, timer):
+        if self.maintenance or self.held:
+            self.wdt.feed()
+            return
+        late = self.late_stage()
+        if late is None:
+            self.wdt.feed()
+            if self.late is not None:
+                logging.warn(f"> Stage {self.names()[self.late]} recovered")
+                self.late = None
+                mem32[_SCRATCH_LATE] = _MAGIC | _NONE
+        elif self.late is None:
+            self.late = late[0]
+            mem32[_SCRATCH_LATE] = _MAGIC | late[0]
+            name = self.names()[late[0]]
+            logging.error(f"> Stage {name} is {late[1]}ms late, no longer feeding the watchdog")
+            self.record('late', name, late[1])
+
+    def check_last_reset(self):
+        if not (mem32[_REASON] & 0x01 and mem32[_SCRATCH4] == _NON_REBOOT_MAGIC):
+            return
+        names = self.names()
+        def name(register):
+            value = mem32[register]
+            if value & 0xfff00000 != _MAGIC or value & 0xff >= len(names):
+                return None
+            return names[value & 0xff]
+        running = name(_SCRATCH_RUNNING)
+        late = name(_SCRATCH_LATE)
+        logging.error(f"> Reset by the watchdog, running {running}, late {late}")
+        self.record('reset', late or running)
+
+    def record(self, cause, stage, overrun = None):
+        records = read_crash_records()
+        records.append({'time': logging.datetime_string(), 'cause': cause, 'stage': stage, 'overrun': overrun})
+        with open(crash_file + '.tmp', 'w') as file:
+            json.dump(records[-_crash_records:], file)
+        os.rename(crash_file + '.tmp', crash_file)
+
+
+def read_crash_records():
+    try:
+        with open(crash_file, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return []